@@ -0,0 +1,249 @@
+import os
+import io
+import glob
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+import random as rd
+import signed_utils as utils
+import iterated_greedy_algorithm as ig
+from benchmark import get_target
+from module.termination import TimeBudget
+
+
+"""
+Batch runner of IG over whole dataset directories.
+Every (dataset, seed) is a job. The cost of a job is estimated from the header of its file, and the jobs are handed
+to a process pool the largest first, so that the small ones fill the gaps at the end instead of a large one
+running alone. Each result is appended to a JSON lines file as soon as it is done, and a rerun skips the jobs
+whose results with the same parameters are in the file already.
+"""
+
+# the parameters a result depends on, a finished job is recognized by them
+RUN_PARAMS = ('max_iter', 'time_budget', 'beta', 'lower_bound')
+
+# the dataset of the last job of this worker process, consecutive jobs are often other seeds of the same file
+_last_dataset = (None, None)
+
+
+def find_datasets(patterns) -> list:
+    """
+    :param patterns: directories (every .g file in them) or glob patterns
+    :return: sorted paths of the datasets, each once
+    """
+
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.g')
+        paths.update(os.path.normpath(path) for path in glob.glob(pattern) if path.endswith('.g'))
+    return sorted(paths)
+
+
+def estimate_cost(path, params) -> float:
+    """
+    relative cost of a job, an iteration of IG visits a share of the nodes and their edges
+
+    :param path: path of the dataset
+    :param params: parameters of the run, see RUN_PARAMS
+    :return: cost in arbitrary units, only comparable within a batch
+    """
+
+    vnum, enum = utils.read_header(path)
+    if params['time_budget'] is not None:
+        # a run stops at its budget at the latest, the larger graph still finishes its initialization later
+        return params['time_budget'] * (1 + (vnum + enum) * 1e-6)
+    return (vnum + enum) * (params['max_iter'] or 1)
+
+
+def job_key(path, seed, params) -> str:
+    return json.dumps([os.path.normpath(path), seed] + [params[key] for key in RUN_PARAMS])
+
+
+def load_results(results_path) -> list:
+    """
+    read the results written so far, a line cut off by an interrupted write is ignored
+
+    :param results_path: path of the JSON lines file
+    :return: a list of result dicts
+    """
+
+    results = []
+    if not os.path.exists(results_path):
+        return results
+    with open(results_path) as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                continue
+    return results
+
+
+def _ends_with_newline(path) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def build_cache(path):
+    """
+    write the binary cache of a dataset, executed in a worker process before the jobs start
+    The seeds of a dataset run at the same time, so they find the cache instead of each of them writing it.
+
+    :param path: path of the dataset
+    :return: None, a dataset which cannot be read is reported by its jobs
+    """
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.load_data(path, cache=True)
+    except (OSError, ValueError):
+        pass
+
+
+def run_job(job) -> dict:
+    """
+    run IG for a (dataset, seed), executed in a worker process
+
+    :param job: (path, seed, params)
+    :return: a result dict, with 'error' if the run failed
+    """
+
+    global _last_dataset
+    path, seed, params = job
+    result = {'dataset': os.path.basename(path), 'path': os.path.normpath(path), 'seed': seed}
+    result.update({key: params[key] for key in RUN_PARAMS})
+    start_time = time.time()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if _last_dataset[0] != path:
+                _last_dataset = (path, utils.load_data(path, cache=True))
+            dataset = _last_dataset[1]
+            rd.seed(seed)
+            termination = TimeBudget(params['time_budget']) if params['time_budget'] is not None else None
+            alg = ig.IteratedGreedy(dataset, beta=params['beta'])
+            best_values, reason = alg.run(max_iter=params['max_iter'], output=False, termination=termination,
+                                          lower_bound=True if params['lower_bound'] else None)
+    except Exception as error:
+        result['error'] = '%s: %s' % (type(error).__name__, error)
+        return result
+
+    obj = alg.objective_function
+    result.update({
+        'vnum': dataset.vnum,
+        'enum': dataset.enum,
+        'value': obj.obj_value,
+        'target': get_target(path, dataset.vnum),
+        'lower_bound_value': alg.lower_bound,
+        'reason': reason,
+        'iterations': len(best_values),
+        'time': time.time() - start_time
+    })
+    if params.get('keep_solutions'):
+        result['solution'] = list(obj.solution)
+    return result
+
+
+def run_batch(patterns, seeds=(0,), max_iter=200, time_budget=None, beta=0.3, lower_bound=True, processes=None,
+              results_path='batch_results.jsonl', keep_solutions=False, output=True) -> list:
+    """
+    run every dataset with every seed, the largest jobs first
+
+    :param patterns: directories or glob patterns of the datasets, see find_datasets()
+    :param seeds: seeds of the repetitions
+    :param max_iter: max number of iterations of each run, None: limited by time_budget only
+    :param time_budget: optional, seconds of each run
+    :param beta: ratio of nodes removed in the destruction phase
+    :param lower_bound: stop a run when the cycle packing bound is reached
+    :param processes: number of worker processes, default: number of CPUs
+    :param results_path: JSON lines file of the results, appended to
+    :param keep_solutions: write the solution vectors into the results as well
+    :param output: print each job when it is done
+    :return: the results of this batch and the earlier ones in the file, one per job
+    """
+
+    if max_iter is None and time_budget is None:
+        raise ValueError('a run needs max_iter or time_budget')
+    params = {'max_iter': max_iter, 'time_budget': time_budget, 'beta': beta, 'lower_bound': lower_bound,
+              'keep_solutions': keep_solutions}
+
+    finished = {}
+    for result in load_results(results_path):
+        if 'error' not in result:
+            finished[job_key(result['path'], result['seed'], result)] = result
+
+    jobs = [(path, seed, params) for path in find_datasets(patterns) for seed in seeds]
+    todo = [job for job in jobs if job_key(*job) not in finished]
+    todo.sort(key=lambda job: estimate_cost(job[0], params), reverse=True)
+    if output:
+        print('%d jobs, %d done already, %d to run' % (len(jobs), len(jobs) - len(todo), len(todo)))
+
+    start_time = time.time()
+    with open(results_path, 'a') as f, multiprocessing.Pool(processes=processes) as pool:
+        # a line cut off by an interrupted write is closed, so that it does not swallow the next result
+        if f.tell() and not _ends_with_newline(results_path):
+            f.write('\n')
+        pool.map(build_cache, sorted({job[0] for job in todo}), chunksize=1)
+        # one job at a time per worker, so that the order of the costs is kept
+        for ct, result in enumerate(pool.imap_unordered(run_job, todo, chunksize=1), 1):
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+            if 'error' not in result:
+                finished[job_key(result['path'], result['seed'], result)] = result
+            if output:
+                print('[%d/%d] %s seed %s: %s (%.1f s, elapsed %.1f s)' %
+                      (ct, len(todo), result['dataset'], result['seed'],
+                       result.get('error') or 'value %d, %s' % (result['value'], result['reason']),
+                       result.get('time', 0), time.time() - start_time))
+
+    return [finished[job_key(*job)] for job in jobs if job_key(*job) in finished]
+
+
+def summarize(results) -> dict:
+    """
+    aggregate the runs of each dataset
+
+    :param results: a list of result dicts
+    :return: dict(dataset: dict(runs, min_value, mean_value, target, mean_time))
+    """
+
+    summary = {}
+    for name in sorted({r['dataset'] for r in results}):
+        runs = [r for r in results if r['dataset'] == name]
+        summary[name] = {
+            'runs': len(runs),
+            'min_value': min(r['value'] for r in runs),
+            'mean_value': sum(r['value'] for r in runs) / len(runs),
+            'target': runs[0]['target'],
+            'mean_time': sum(r['time'] for r in runs) / len(runs)
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='run IG over dataset directories with several seeds')
+    parser.add_argument('patterns', nargs='*', default=['datasets'], help='directories or glob patterns of .g files')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0])
+    parser.add_argument('--max-iter', type=int, default=200, help='0: limited by the time budget only')
+    parser.add_argument('--time-budget', type=float, default=None, help='seconds of each run')
+    parser.add_argument('--beta', type=float, default=0.3)
+    parser.add_argument('--no-lower-bound', action='store_true', help='do not stop at the cycle packing bound')
+    parser.add_argument('--processes', type=int, default=None, help='default: number of CPUs')
+    parser.add_argument('--results', default='batch_results.jsonl', help='JSON lines file of the results')
+    parser.add_argument('--solutions', action='store_true', help='write the solution vectors into the results')
+    args = parser.parse_args()
+
+    results = run_batch(args.patterns, seeds=args.seeds, max_iter=args.max_iter or None, time_budget=args.time_budget,
+                        beta=args.beta, lower_bound=not args.no_lower_bound, processes=args.processes,
+                        results_path=args.results, keep_solutions=args.solutions)
+    for name, row in summarize(results).items():
+        print('%s: %d runs, min %d, mean %.1f, target %s, %.1f s per run' %
+              (name, row['runs'], row['min_value'], row['mean_value'], row['target'], row['mean_time']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import os
+import io
+import sys
+import glob
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+import random as rd
+import signed_utils as utils
+import iterated_greedy_algorithm as ig
+from main import TARGETS
+from module.termination import Termination, TimeBudget
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+"""
+Time-to-target benchmark of IG over the datasets.
+Each (dataset, seed) runs in a fresh process for a fixed time, the report records
+    time-to-target, best value after the fixed time, iterations per second and peak memory,
+and can be compared with a stored baseline report to flag regressions.
+"""
+
+
+class ProgressRecorder(Termination):
+    """
+    never stops a run, records the time when the best value improves
+    """
+
+    def __init__(self):
+        self.start_time = None
+        self.trace = []
+
+    def start(self):
+        self.start_time = time.time()
+        self.trace = []
+
+    def stop(self, iteration, value):
+        if not self.trace or value < self.trace[-1][2]:
+            self.trace.append((iteration, time.time() - self.start_time, value))
+        return None
+
+
+def get_target(path, vnum):
+    # the targets in main.py are known for the slashdot datasets
+    if 'slashdot' in os.path.basename(path):
+        return TARGETS.get(vnum)
+    return None
+
+
+def run_once(path, seed, time_limit, beta=0.3):
+    """
+    one benchmark run, executed in a fresh worker process
+
+    :param path: path of the dataset
+    :param seed: seed of the random module
+    :param time_limit: wall-clock budget of the run including the initialization, seconds
+    :param beta: ratio of nodes removed in the destruction phase
+    :return: a dict of the measurements
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        dataset = utils.load_data(path, cache=True)
+        rd.seed(seed)
+        target = get_target(path, dataset.vnum)
+        recorder = ProgressRecorder()
+
+        start_time = time.time()
+        alg = ig.IteratedGreedy(dataset, beta=beta)
+        best_values, reason = alg.run(max_iter=None, output=False, termination=TimeBudget(time_limit) | recorder)
+        elapsed = time.time() - start_time
+
+    time_to_target = None
+    if target is not None:
+        for iteration, t, value in recorder.trace:
+            if value <= target:
+                time_to_target = t
+                break
+
+    peak_memory = None
+    if resource is not None:
+        # kilobytes on Linux, bytes on macOS
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        'dataset': os.path.basename(path),
+        'seed': seed,
+        'vnum': dataset.vnum,
+        'enum': dataset.enum,
+        'target': target,
+        'time_to_target': time_to_target,
+        'best_value': min(best_values) if best_values else alg.objective_function.obj_value,
+        'iterations': len(best_values),
+        'iterations_per_second': len(best_values) / elapsed if elapsed > 0 else None,
+        'elapsed': elapsed,
+        'peak_memory': peak_memory,
+        'trace': recorder.trace
+    }
+
+
+def _run_job(job):
+    return run_once(*job)
+
+
+def summarize(results):
+    """
+    aggregate the runs of each dataset
+
+    :param results: a list of the dicts returned by run_once()
+    :return: dict(dataset: dict of the aggregated measurements)
+    """
+
+    summary = {}
+    for name in sorted({r['dataset'] for r in results}):
+        runs = [r for r in results if r['dataset'] == name]
+        hits = sorted(r['time_to_target'] for r in runs if r['time_to_target'] is not None)
+        memory = [r['peak_memory'] for r in runs if r['peak_memory'] is not None]
+        speeds = [r['iterations_per_second'] for r in runs if r['iterations_per_second'] is not None]
+        summary[name] = {
+            'runs': len(runs),
+            'target': runs[0]['target'],
+            'hits': len(hits),
+            'median_time_to_target': hits[len(hits) // 2] if hits else None,
+            'mean_best_value': sum(r['best_value'] for r in runs) / len(runs),
+            'min_best_value': min(r['best_value'] for r in runs),
+            'mean_iterations_per_second': sum(speeds) / len(speeds) if speeds else None,
+            'max_peak_memory': max(memory) if memory else None
+        }
+    return summary
+
+
+def run_benchmark(paths, seeds=(0, 1, 2), time_limit=10.0, beta=0.3, processes=1, output=True):
+    """
+    run every dataset with every seed
+
+    :param paths: paths of the datasets
+    :param seeds: seeds of the repetitions
+    :param time_limit: wall-clock budget of each run, seconds
+    :param beta: ratio of nodes removed in the destruction phase
+    :param processes: number of runs executed at the same time, 1 gives the most reliable timings
+    :param output: print each run when it is done
+    :return: the report, a dict with "config", "results" and "summary"
+    """
+
+    jobs = [(path, seed, time_limit, beta) for path in paths for seed in seeds]
+    results = []
+    # a fresh process for each run, the peak memory of a process belongs to a single run
+    with multiprocessing.Pool(processes=processes, maxtasksperchild=1) as pool:
+        for result in pool.imap(_run_job, jobs):
+            results.append(result)
+            if output:
+                print('%s seed %d: best value %d, time to target %s, %.1f iterations/s' %
+                      (result['dataset'], result['seed'], result['best_value'], result['time_to_target'],
+                       result['iterations_per_second'] or 0))
+
+    return {
+        'config': {
+            'seeds': list(seeds),
+            'time_limit': time_limit,
+            'beta': beta,
+            'processes': processes,
+            'python': sys.version.split()[0],
+            'numpy': utils.np is not None,
+            'timestamp': int(time.time())
+        },
+        'results': results,
+        'summary': summarize(results)
+    }
+
+
+def compare(report, baseline, tolerance=0.1):
+    """
+    compare the summary of a report with a baseline report
+
+    :param report: the current report
+    :param baseline: the stored report
+    :param tolerance: relative change accepted before a measurement is flagged
+    :return: a list of regression messages, empty if none
+    """
+
+    regressions = []
+    for name, current in report['summary'].items():
+        previous = baseline['summary'].get(name)
+        if previous is None:
+            continue
+
+        def flag(key, higher_is_worse=True):
+            old, new = previous.get(key), current.get(key)
+            if old is None or new is None or old == 0:
+                return
+            change = (new - old) / abs(old)
+            if (change > tolerance) if higher_is_worse else (change < -tolerance):
+                regressions.append('%s: %s %s -> %s (%+.1f%%)' % (name, key, old, new, change * 100))
+
+        flag('mean_best_value')
+        flag('median_time_to_target')
+        flag('mean_iterations_per_second', higher_is_worse=False)
+        flag('max_peak_memory')
+        if current['hits'] < previous['hits']:
+            regressions.append('%s: hits %d -> %d' % (name, previous['hits'], current['hits']))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='time-to-target benchmark of IG')
+    parser.add_argument('--datasets', default='datasets/*.g', help='glob of the dataset files')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--time-limit', type=float, default=10.0, help='seconds for each run')
+    parser.add_argument('--beta', type=float, default=0.3)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--output', default='bench_report.json', help='path of the report')
+    parser.add_argument('--baseline', help='a stored report to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    # small datasets first
+    paths = sorted(glob.glob(args.datasets), key=os.path.getsize)
+    report = run_benchmark(paths, seeds=args.seeds, time_limit=args.time_limit, beta=args.beta,
+                           processes=args.processes)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('-> The report is written as ' + args.output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, tolerance=args.tolerance)
+        for message in regressions:
+            print('REGRESSION', message)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
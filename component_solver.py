@@ -0,0 +1,182 @@
+import io
+import time
+import contextlib
+import concurrent.futures
+import random as rd
+import signed_utils as utils
+import iterated_greedy_algorithm as ig
+from module.termination import TimeBudget
+from module.kernelization import Kernelization
+
+
+"""
+Component decomposition of IG.
+The frustration index is the sum over the connected components and no cluster has to span two of them,
+so each component is solved on its own and the partitions are put together:
+    * components without a frustrated edge among their positive components are solved exactly at once,
+    * tiny components are solved exactly by enumerating their partitions,
+    * the others run IG on a process pool, the largest first, on their kernel (see Kernelization) by default.
+"""
+
+
+def _component_dataset(graph: utils.SignedGraph) -> utils.Dataset:
+    dataset = utils.Dataset()
+    dataset.vnum, dataset.enum = graph.vnum, graph.enum
+    dataset.graph = graph
+    return dataset
+
+
+def _frustration(graph: utils.SignedGraph, solution) -> int:
+    return sum(1 for n1, n2, attr in graph.edges() if (solution[n1] == solution[n2]) != (attr == 1))
+
+
+def solve_trivially(graph: utils.SignedGraph, tiny=8):
+    """
+    exact solutions of the easy components, None if the component needs a search
+
+    :param graph: the graph of a component
+    :param tiny: components with at most tiny nodes are solved by enumerating all the partitions
+    :return: (solution list, frustration index, method) or None
+    """
+
+    # the positive components as clusters: only negative edges inside them are frustrated, 0 is optimal
+    solution = [0] * graph.vnum
+    for cid, component in enumerate(graph.components(positive_only=True)):
+        for node in component:
+            solution[node] = cid
+    value = _frustration(graph, solution)
+    if value == 0:
+        return solution, 0, 'balanced'
+    if graph.vnum > tiny:
+        return None
+
+    # restricted growth strings, each partition of the nodes once
+    edges = list(graph.edges())
+    best, best_value = list(solution), value
+    rgs = [0] * graph.vnum
+
+    def enumerate_partitions(i, max_cid):
+        nonlocal best, best_value
+        if i == graph.vnum:
+            value = sum(1 for n1, n2, attr in edges if (rgs[n1] == rgs[n2]) != (attr == 1))
+            if value < best_value:
+                best, best_value = list(rgs), value
+            return
+        for cid in range(max_cid + 2):
+            rgs[i] = cid
+            enumerate_partitions(i + 1, max(max_cid, cid))
+
+    if graph.vnum:
+        enumerate_partitions(1, 0)
+    return best, best_value, 'exhaustive'
+
+
+def solve_with_ig(graph: utils.SignedGraph, max_iter=200, time_budget=None, seed=None, beta=0.3, kernelize=True):
+    """
+    run IG on the graph of a component, executed in a worker process
+    The graph is reduced by Kernelization first and the solution of the kernel is lifted back.
+
+    :param graph: the graph of a component
+    :param max_iter: max number of iterations
+    :param time_budget: optional, seconds
+    :param seed: seed of the random module
+    :param beta: ratio of nodes removed in the destruction phase
+    :param kernelize: apply the reductions of Kernelization before IG
+    :return: (solution list, frustration index, method)
+    """
+
+    rd.seed(seed)
+    kernel = Kernelization(graph) if kernelize else None
+    reduced = kernel.graph if kernel is not None else graph
+    if reduced.vnum == 0:
+        return kernel.lift([]), 0, 'kernel'
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        alg = ig.IteratedGreedy(_component_dataset(reduced), beta=beta)
+        # a component is done as soon as its cycle packing bound is reached
+        alg.run(max_iter=max_iter, output=False,
+                termination=TimeBudget(time_budget) if time_budget is not None else None, lower_bound=True)
+    obj = alg.objective_function
+    solution = [obj.solution[i] for i in range(reduced.vnum)]
+    if kernel is not None:
+        # the kernel has the same optimum, the lifted solution has the same value
+        return kernel.lift(solution), obj.obj_value, 'kernel+ig'
+    return solution, obj.obj_value, 'ig'
+
+
+def solve_components(dataset: utils.Dataset, max_iter=200, time_budget=None, workers=None, tiny=8, seed=None,
+                     beta=0.3, kernelize=True, output=True):
+    """
+    split the graph into connected components, solve them independently and combine the results
+
+    :param dataset: an instance of class Dataset
+    :param max_iter: max number of IG iterations of each component, the cost of an iteration grows with its size
+    :param time_budget: optional, seconds in total, shared by the IG components in proportion to their edges
+    :param workers: number of worker processes, default: number of CPUs, 1: run in the current process
+    :param tiny: components with at most tiny nodes are solved exactly, see solve_trivially()
+    :param seed: base seed, component i uses seed + i, default: drawn from the random module
+    :param beta: ratio of nodes removed in the destruction phase
+    :param kernelize: reduce the IG components by Kernelization first
+    :param output: print a summary
+    :return: (frustration index, solution list, a list of dict(nodes, value, method) for each component)
+    """
+
+    start_time = time.time()
+    if seed is None:
+        seed = rd.randrange(1 << 30)
+    graph = dataset.graph
+    components = graph.components()
+
+    results = [None] * len(components)
+    subgraphs = {}
+    for idx, nodes in enumerate(components):
+        if len(nodes) == 1:
+            results[idx] = ([0], 0, 'isolated')
+            continue
+        subgraph = graph.subgraph(nodes)
+        results[idx] = solve_trivially(subgraph, tiny=tiny)
+        if results[idx] is None:
+            subgraphs[idx] = subgraph
+
+    # the largest components first, the small ones fill the gaps of the pool
+    order = sorted(subgraphs, key=lambda i: subgraphs[i].enum, reverse=True)
+    total_enum = sum(subgraphs[i].enum for i in order)
+    budgets = {i: time_budget * subgraphs[i].enum / total_enum if time_budget is not None else None for i in order}
+
+    if workers == 1 or len(order) <= 1:
+        for i in order:
+            results[i] = solve_with_ig(subgraphs[i], max_iter, budgets[i], seed + i, beta, kernelize)
+    elif order:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {i: executor.submit(solve_with_ig, subgraphs[i], max_iter, budgets[i], seed + i, beta,
+                                          kernelize)
+                       for i in order}
+            for i, future in futures.items():
+                results[i] = future.result()
+
+    # the cluster ids of the components are shifted into disjoint ranges
+    solution = [0] * dataset.vnum
+    value = 0
+    details = []
+    shift = 0
+    for nodes, (local_solution, local_value, method) in zip(components, results):
+        for node, cid in zip(nodes, local_solution):
+            solution[node] = shift + cid
+        shift += max(local_solution) + 1
+        value += local_value
+        details.append({'nodes': len(nodes), 'value': local_value, 'method': method})
+
+    if output:
+        methods = {}
+        for detail in details:
+            methods[detail['method']] = methods.get(detail['method'], 0) + 1
+        print('%d components: %s' % (len(components), ', '.join('%d %s' % (n, m) for m, n in methods.items())))
+        print('Best Value:', value)
+        print('time cost:', time.time() - start_time, "s")
+    return value, solution, details
+
+
+if __name__ == '__main__':
+
+    ds = utils.load_data('datasets/slashdot-undirected-size2000-part0.g', cache=True)
+    solve_components(ds, max_iter=100)
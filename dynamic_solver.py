@@ -0,0 +1,134 @@
+import time
+import random as rd
+import signed_utils as utils
+from module.frustration import Frustration
+from module.neighborhood import Neighborhood
+from module.local_search import LocalSearch
+
+
+class DynamicSolver:
+    """
+    Incremental re-solve of a signed graph whose edges change over time.
+    The graph of the dataset is replaced by a DynamicSignedGraph, and a batch of changes is applied in three steps:
+        1. the graph and the connectivity tables of Frustration are updated edge by edge, O(1) per edge,
+        2. the incremental local search starts from the end nodes of the changed edges, see local_move_incremental(),
+        3. the clusters around the moved nodes are merged with their best adjacent cluster while it improves.
+    So the partition stays valid and locally optimal with work proportional to the region affected by the batch.
+    A full IG run on graph.to_graph() is still the way to escape from the local optimum now and then.
+    """
+
+    def __init__(self, dataset: utils.Dataset, solution=None):
+        """
+        class initialization
+
+        :param dataset: an instance of class Dataset, its graph is replaced by a DynamicSignedGraph
+        :param solution: optional, the solution vector to start from, e.g. the result of IG,
+                         default: singletons improved by a full local search
+        """
+
+        if not isinstance(dataset.graph, utils.DynamicSignedGraph):
+            dataset.graph = utils.DynamicSignedGraph.from_graph(dataset.graph)
+        self.dataset = dataset
+        self.graph = dataset.graph
+        self.neighborhood = Neighborhood(dataset)
+        self.objective_function = Frustration(dataset, init_solution=solution, graph=self.graph)
+        self.local_search = LocalSearch(self.objective_function, self.neighborhood, list(range(dataset.vnum)))
+        if solution is None:
+            self.local_search.local_move()
+            self.local_search.community_merge()
+        # only the changes from now on need to be revisited
+        self.objective_function.touched = set()
+        # number of edge changes applied and time spent on them
+        self.updates = 0
+        self.time_cost = 0.0
+
+    @property
+    def value(self):
+        # current frustration index
+        return self.objective_function.obj_value
+
+    @property
+    def solution(self):
+        return self.objective_function.solution
+
+    def apply(self, insertions=(), deletions=(), flips=(), repair=True):
+        """
+        apply a batch of edge changes, the deletions first, then the flips and the insertions
+        Note: a ValueError is raised at the first invalid change, the changes before it stay applied
+
+        :param insertions: an iterable of (n1, n2, sign)
+        :param deletions: an iterable of (n1, n2)
+        :param flips: an iterable of (n1, n2), the sign of each edge is reversed
+        :param repair: run the localized search after the batch, see repair()
+        :return: frustration index after the batch
+        """
+
+        start_time = time.time()
+        g, obj = self.graph, self.objective_function
+        count = 0
+
+        for n1, n2 in deletions:
+            obj.remove_edge(n1, n2, g.remove_edge(n1, n2))
+            count += 1
+        for n1, n2 in flips:
+            attr = g.flip_edge(n1, n2)
+            obj.remove_edge(n1, n2, -attr)
+            obj.insert_edge(n1, n2, attr)
+            count += 1
+        for n1, n2, attr in insertions:
+            g.insert_edge(n1, n2, attr)
+            obj.insert_edge(n1, n2, attr)
+            count += 1
+
+        self.dataset.enum = g.enum
+        if repair:
+            self.repair()
+        self.updates += count
+        self.time_cost += time.time() - start_time
+        return obj.obj_value
+
+    def repair(self):
+        """
+        localized search around the nodes changed since the last repair
+
+        :return: number of nodes moved
+        """
+
+        obj = self.objective_function
+        ls = self.local_search
+        # an edge change alters the deltas of its end nodes only, the neighbors are enqueued when they move
+        changed = obj.touched
+        moved = ls.local_move_incremental(seeds=changed)
+
+        # the clusters around the changes, each is merged with its best adjacent cluster while it improves
+        merged = False
+        sl = self.solution
+        for cid in {sl[node] for node in changed | moved}:
+            while cid in obj.partition:
+                candidate, min_delta = obj.best_merge(cid)
+                if candidate == -1:
+                    break
+                # the smaller cluster is merged into the larger one
+                if obj.partition.size[cid] < obj.partition.size[candidate]:
+                    cid, candidate = candidate, cid
+                obj.merge(cid, candidate, min_delta)
+                merged = True
+        if merged:
+            moved |= ls.local_move_incremental()
+
+        # the nodes still queued when the budget ran out are left as they are
+        obj.touched = set()
+        return len(moved)
+
+
+if __name__ == '__main__':
+
+    ds = utils.load_data('datasets/slashdot-undirected-size10000-part0.g', cache=True)
+    solver = DynamicSolver(ds)
+    print('Initial value:', solver.value)
+
+    # random sign flips of existing edges in batches of 100
+    edges = [(n1, n2) for n1, n2, _ in solver.graph.edges()]
+    for _ in range(50):
+        solver.apply(flips=rd.sample(edges, 100))
+    print('%d updates, %.0f updates/s, value %d' % (solver.updates, solver.updates / solver.time_cost, solver.value))
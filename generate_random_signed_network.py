@@ -1,96 +1,177 @@
-import collections
+import time
 import random as rd
 import signed_utils as utils
 
+np = utils.np
 
-def generate_signed_networks(c, n: int or list, k, pin, pn, pp):
-    """
-    quoted from: Community Mining from Signed Social Networks. IEEE Educational Activities Department, 19(10), 1333-1348.
 
-    :param c: number of clusters, int
-    :param n: number of nodes in each cluster, int or list
-    :param k: degree of each node
-    :param pin: the ratio of edges within clusters
-    :param pn: the ratio of negative edges within clusters
-    :param pp: the ratio of positive edges between clusters
-    :return:
+def count_edges(c, n: int or list, k, pin, pn, pp):
     """
+    the numbers of edges of the model, fixed before sampling
 
-    dataset = utils.Dataset()
-    g = collections.defaultdict(lambda: collections.defaultdict(lambda: 0))
+    :return: (number of nodes, number of edges, [(edges, negative edges) within each cluster],
+              (edges, positive edges) between clusters, start id of each cluster)
+    """
 
     if isinstance(n, int):
         n = [n] * c
-    node_num = sum(n)
-    edge_num = 0
     k = k // 2
 
-    # add edges within clusters
     start_id = [0]
     for num in n:
-        e = start_id[-1]
-        start_id.append(e + num)
+        start_id.append(start_id[-1] + num)
+    node_num = start_id[-1]
 
+    within = []
     for i in range(c):
-
         edges_in_cluster = int(n[i] * pin * k)
-        edge_num += edges_in_cluster
-        negative_edges_in_cluster = int(edges_in_cluster * pn)
-
-        # add negative edges within clusters
-        for _ in range(negative_edges_in_cluster):
-            n1, n2 = rd.sample(range(start_id[i], start_id[i + 1]), 2)
-            while g[n1][n2] != 0:
-                n1, n2 = rd.sample(range(start_id[i], start_id[i + 1]), 2)
-            g[n1][n2] = g[n2][n1] = -1
-
-        # add positive edges within clusters
-        for _ in range(edges_in_cluster - negative_edges_in_cluster):
-            n1, n2 = rd.sample(range(start_id[i], start_id[i + 1]), 2)
-            while g[n1][n2] != 0:
-                n1, n2 = rd.sample(range(start_id[i], start_id[i + 1]), 2)
-            g[n1][n2] = g[n2][n1] = 1
-
-    # add edges between clusters
+        if edges_in_cluster > n[i] * (n[i] - 1) // 2:
+            raise ValueError('cluster %d has %d nodes, too few for %d edges' % (i, n[i], edges_in_cluster))
+        within.append((edges_in_cluster, int(edges_in_cluster * pn)))
+
     edges_between_clusters = int(node_num * k * (1 - pin))
-    edge_num += edges_between_clusters
-    positive_edges_between_clusters = int(edges_between_clusters * pp)
-    # add positive edges between clusters
-    for _ in range(positive_edges_between_clusters):
-        c1, c2 = rd.sample(range(c), 2)
-        while c1 == c2:
-            c1, c2 = rd.sample(range(c), 2)
-        n1 = rd.choice(range(start_id[c1], start_id[c1 + 1]))
-        n2 = rd.choice(range(start_id[c2], start_id[c2 + 1]))
-        while g[n1][n2] != 0:
-            c1, c2 = rd.sample(range(c), 2)
-            while c1 == c2:
-                c1, c2 = rd.sample(range(c), 2)
-            n1 = rd.choice(range(start_id[c1], start_id[c1 + 1]))
-            n2 = rd.choice(range(start_id[c2], start_id[c2 + 1]))
-        g[n1][n2] = g[n2][n1] = 1
-    # add negative edges between clusters
-    for _ in range(edges_between_clusters - positive_edges_between_clusters):
-        c1, c2 = rd.sample(range(c), 2)
-        while c1 == c2:
-            c1, c2 = rd.sample(range(c), 2)
-        n1 = rd.choice(range(start_id[c1], start_id[c1 + 1]))
-        n2 = rd.choice(range(start_id[c2], start_id[c2 + 1]))
-        while g[n1][n2] != 0:
-            c1, c2 = rd.sample(range(c), 2)
-            while c1 == c2:
-                c1, c2 = rd.sample(range(c), 2)
-            n1 = rd.choice(range(start_id[c1], start_id[c1 + 1]))
-            n2 = rd.choice(range(start_id[c2], start_id[c2 + 1]))
-        g[n1][n2] = g[n2][n1] = -1
-
-    dataset.vnum = node_num
-    dataset.enum = edge_num
-    dataset.data = g
-    print("Generation complete!")
-    paras = [c, n[0], k, pin, pn, pp]
-    utils.dataset2g(file_name="generated_dataset_" + "_".join([str(e) for e in paras]), dataset=dataset)
+    between = (edges_between_clusters, int(edges_between_clusters * pp))
+    edge_num = sum(e for e, _ in within) + edges_between_clusters
+    return node_num, edge_num, within, between, start_id
+
 
+def generate_edges(c, n: int or list, k, pin, pn, pp, seed=None):
+    """
+    sample the edges of the model chunk by chunk, each undirected edge once (n1 < n2)
+    The edges within a cluster are a chunk, so are the edges between a cluster and the clusters of larger ids,
+    the memory is bounded by the largest chunk instead of the whole network.
+
+    :param seed: seed of the random generator, the same seed gives the same network
+    :return: a generator of (n1 array, n2 array, sign array) chunks
+    """
+
+    node_num, edge_num, within, between, start_id = count_edges(c, n, k, pin, pn, pp)
+    if np is None:
+        yield from _generate_edges_python(c, within, between, start_id, seed)
+        return
+
+    rng = np.random.default_rng(seed)
+    sizes = np.diff(np.array(start_id, dtype=np.int64))
+
+    # edges within clusters, pairs of distinct nodes of the cluster
+    for i, (edges_in_cluster, negative_edges) in enumerate(within):
+        start, size = start_id[i], int(sizes[i])
+
+        def draw(m):
+            n1 = rng.integers(size, size=m)
+            n2 = rng.integers(size - 1, size=m)
+            n2 += n2 >= n1
+            return (start + np.minimum(n1, n2)) * node_num + start + np.maximum(n1, n2)
+
+        keys = _distinct_keys(rng, edges_in_cluster, draw)
+        yield _split_keys(rng, keys, node_num, edges_in_cluster - negative_edges)
+
+    # edges between clusters, a pair of clusters is chosen uniformly, then a node of each
+    # the chunks are grouped by the smaller cluster id, so the keys of different chunks never collide
+    edges_between_clusters, positive_edges = between
+    if edges_between_clusters == 0:
+        return
+    if c < 2:
+        raise ValueError('edges between clusters need at least 2 clusters')
+    pairs = np.arange(c - 1, -1, -1, dtype=np.float64)
+    group_edges = rng.multinomial(edges_between_clusters, pairs / pairs.sum())
+    group_positive = rng.multivariate_hypergeometric(group_edges, positive_edges)
+
+    for c1 in range(c - 1):
+        m = int(group_edges[c1])
+        if m == 0:
+            continue
+        if m > int(sizes[c1]) * int(sizes[c1 + 1:].sum()):
+            raise ValueError('too few node pairs between cluster %d and the others for %d edges' % (c1, m))
+
+        def draw(size):
+            c2 = rng.integers(c1 + 1, c, size=size)
+            n1 = start_id[c1] + rng.integers(sizes[c1], size=size)
+            n2 = np.array(start_id, dtype=np.int64)[c2] + (rng.random(size) * sizes[c2]).astype(np.int64)
+            return n1 * node_num + n2
+
+        keys = _distinct_keys(rng, m, draw)
+        yield _split_keys(rng, keys, node_num, int(group_positive[c1]))
+
+
+def _distinct_keys(rng, m, draw):
+    # draw pairs in bulk and drop the duplicates by sorting until m distinct pairs are found
+    keys = np.empty(0, dtype=np.int64)
+    while len(keys) < m:
+        need = m - len(keys)
+        keys = np.unique(np.concatenate((keys, draw(need + need // 8 + 16))))
+    if len(keys) > m:
+        # a uniform subset, the surplus of the last draw is not biased towards small keys
+        keys = keys[np.sort(rng.choice(len(keys), m, replace=False))]
+    return keys
+
+
+def _split_keys(rng, keys, node_num, positive):
+    # exactly `positive` edges of the chunk are chosen at random to be positive
+    signs = np.full(len(keys), -1, dtype=np.int8)
+    signs[rng.choice(len(keys), positive, replace=False)] = 1
+    return keys // node_num, keys % node_num, signs
+
+
+def _generate_edges_python(c, within, between, start_id, seed):
+    # the same model without numpy, one edge at a time with a set for the duplicates
+    rng = rd.Random(seed)
+
+    for i, (edges_in_cluster, negative_edges) in enumerate(within):
+        edges = set()
+        while len(edges) < edges_in_cluster:
+            n1, n2 = rng.sample(range(start_id[i], start_id[i + 1]), 2)
+            edges.add((min(n1, n2), max(n1, n2)))
+        yield _split_edges(rng, edges, edges_in_cluster - negative_edges)
+
+    edges_between_clusters, positive_edges = between
+    edges = set()
+    while len(edges) < edges_between_clusters:
+        c1, c2 = sorted(rng.sample(range(c), 2))
+        n1 = rng.randrange(start_id[c1], start_id[c1 + 1])
+        n2 = rng.randrange(start_id[c2], start_id[c2 + 1])
+        edges.add((n1, n2))
+    if edges:
+        yield _split_edges(rng, edges, positive_edges)
+
+
+def _split_edges(rng, edges, positive):
+    edges = sorted(edges)
+    signs = [-1] * len(edges)
+    for idx in rng.sample(range(len(edges)), positive):
+        signs[idx] = 1
+    return [e[0] for e in edges], [e[1] for e in edges], signs
+
+
+def generate_signed_networks(c, n: int or list, k, pin, pn, pp, seed=None, file_name=None, binary=False):
+    """
+    quoted from: Community Mining from Signed Social Networks.
+                 IEEE Educational Activities Department, 19(10), 1333-1348.
+    The edges are sampled in bulk and streamed into a .g file chunk by chunk.
+
+    :param c: number of clusters, int
+    :param n: number of nodes in each cluster, int or list
+    :param k: degree of each node
+    :param pin: the ratio of edges within clusters
+    :param pn: the ratio of negative edges within clusters
+    :param pp: the ratio of positive edges between clusters
+    :param seed: optional, seed of the random generator
+    :param file_name: optional, default: generated_dataset_<paras>_<time stamp>.g
+    :param binary: also write the binary cache of the file, see signed_utils.write_edges()
+    :return: file_name
+    """
+
+    node_num, edge_num, _, _, _ = count_edges(c, n, k, pin, pn, pp)
+    if file_name is None:
+        paras = [c, n if isinstance(n, int) else n[0], k // 2, pin, pn, pp]
+        file_name = "generated_dataset_" + "_".join([str(e) for e in paras]) + "_" + str(int(time.time())) + ".g"
+
+    utils.write_edges(file_name, node_num, generate_edges(c, n, k, pin, pn, pp, seed=seed), enum=edge_num,
+                      binary=binary)
+
+    print("Generation complete!")
+    print('-> The dataset is write as ' + file_name)
+    return file_name
 
 
 # 8 [1761, 1747, 1735, 1732, 1732, 1732, 1732, 1732, 1732, 1732, 1732, 1732, 1732, 1731, 1731, 1731, 1731, 1731, 1731, 1731, 1731, 1731, 1731, 1731, 1731, 1731, 1731, 1730, 1730, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729, 1729]
@@ -99,4 +180,5 @@ def generate_signed_networks(c, n: int or list, k, pin, pn, pp):
 # 23 [3561, 3522, 3513, 3512, 3511, 3511, 3508, 3507, 3505, 3505, 3502, 3500, 3500, 3500, 3498, 3498, 3497, 3497, 3497, 3497, 3497, 3497, 3497, 3496, 3496, 3496, 3496, 3496, 3495, 3495, 3495, 3495, 3495, 3495, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3494, 3493, 3493, 3493, 3493, 3493, 3493, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3492, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3491, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490, 3490]
 
 
-generate_signed_networks(c=100, n=20, k=12, pin=0.8, pn=0.2, pp=0.5)
+if __name__ == '__main__':
+    generate_signed_networks(c=100, n=20, k=12, pin=0.8, pn=0.2, pp=0.5)
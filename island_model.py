@@ -0,0 +1,119 @@
+import math
+import time
+import random as rd
+import multiprocessing
+import signed_utils as utils
+from iterated_greedy_algorithm import IteratedGreedy
+
+
+"""
+Island model of IG.
+Several IG instances (islands) run in separate processes. Every `migration_interval` iterations each island sends
+its best solution to the driver, and receives the best solution of its predecessor in a ring of islands,
+which is adopted or not under the acceptance criterion of the island.
+"""
+
+
+def _island(idx, dataset, conn, max_iter, migration_interval, beta, method, seed):
+    """
+    the loop of an island, executed in a worker process
+
+    :param idx: number of the island
+    :param conn: the end of a pipe connected to the driver
+    :return: None
+    """
+
+    rd.seed(seed + idx)
+    ig = IteratedGreedy(dataset, beta=beta)
+    ig.initialization(output=False)
+    ig.local_search.local_move()
+    ig.local_search.community_merge()
+
+    obj = ig.objective_function
+    best_value, best_solution = obj.obj_value, [obj.solution[i] for i in range(dataset.vnum)]
+    ct = 0
+
+    while ct < max_iter:
+        for _ in range(min(migration_interval, max_iter - ct)):
+            ig.iterate(method=method)
+            if obj.obj_value < best_value:
+                best_value, best_solution = obj.obj_value, [obj.solution[i] for i in range(dataset.vnum)]
+            ct += 1
+
+        conn.send((best_value, best_solution))
+        migrant = conn.recv()
+        if migrant is None:
+            break
+        ig.migrate(migrant[1], migrant[0], method=method)
+
+    conn.close()
+
+
+def run_islands(dataset: utils.Dataset, islands=4, max_iter=200, migration_interval=10, beta=0.3,
+                method='better', seed=None, output=True):
+    """
+    run IG on several islands in parallel
+
+    :param dataset: a given dataset
+    :param islands: number of islands, one process for each
+    :param max_iter: number of IG iterations on each island
+    :param migration_interval: number of iterations between two migrations
+    :param beta: ratio of nodes removed in the destruction phase
+    :param method: acceptance criterion of the islands, enum {"better", "metropolis"}
+    :param seed: island i uses seed + i, default: drawn from the random module
+    :param output: print the global incumbent when it improves
+    :return: best value, best solution vector, history of the incumbent [(iteration, value)]
+    """
+
+    if seed is None:
+        seed = rd.randrange(2 ** 32)
+
+    start_time = time.time()
+    conns, processes = [], []
+    for idx in range(islands):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        p = multiprocessing.Process(target=_island, args=(idx, dataset, child_conn, max_iter, migration_interval,
+                                                          beta, method, seed))
+        p.start()
+        child_conn.close()
+        conns.append(parent_conn)
+        processes.append(p)
+
+    best_value, best_solution = math.inf, None
+    history = []
+    epochs = math.ceil(max_iter / migration_interval)
+
+    try:
+        for epoch in range(epochs):
+            reports = [conn.recv() for conn in conns]
+            ct = min((epoch + 1) * migration_interval, max_iter)
+
+            value, solution = min(reports, key=lambda x: x[0])
+            if value < best_value:
+                best_value, best_solution = value, solution
+                history.append((ct, value))
+                if output:
+                    print('%d/%d: best value --> %d, execution time: %.2f s' %
+                          (ct, max_iter, value, time.time() - start_time))
+
+            # ring topology, island i receives the elite of island i - 1
+            last = epoch == epochs - 1
+            for idx, conn in enumerate(conns):
+                conn.send(None if last else reports[idx - 1])
+    finally:
+        for p in processes:
+            p.join()
+
+    if output:
+        print('Island model complete!')
+        print('=' * 40)
+        print('Best Value:', best_value)
+        print('time cost:', time.time() - start_time, "s")
+    return best_value, best_solution, history
+
+
+if __name__ == '__main__':
+
+    file_name = r'datasets/slashdot-undirected-size4000-part0.g'
+    ds = utils.load_data(file_name)
+    run_islands(ds, islands=multiprocessing.cpu_count(), max_iter=200, migration_interval=10)
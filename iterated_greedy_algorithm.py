@@ -1,6 +1,7 @@
 from module import *
 import time
 import math
+import array
 import signed_utils as utils
 import random as rd
 
@@ -20,24 +21,56 @@ class IteratedGreedy:
         4. return s_*
     """
 
-    def __init__(self, dataset: utils.Dataset, beta=0.3):
+    def __init__(self, dataset: utils.Dataset, beta=0.3, compact_interval=None, profiler: Profiler = None,
+                 batch_moves=False, kernelize=False, neighborhood: Neighborhood = None):
         """
         class initialization
 
         :param dataset: a given dataset
+        :param beta: ratio of nodes removed in the destruction phase
+        :param compact_interval: optional, renumber the clusters into a dense range every compact_interval iterations
+        :param profiler: optional, records the time of each phase and the calls of the objective function
+        :param batch_moves: evaluate the moves of the reconstruction and of the local_move sweeps in batches
+                            with BatchMoveEvaluator, ignored if numpy is not available
+        :param kernelize: reduce the graph by Kernelization first, the search runs on the kernel
+                          and full_solution() lifts its solutions back to the dataset
+        :param neighborhood: optional, the neighborhood of an earlier instance on the same dataset, e.g. kept by
+                             a long-running process, its graph is pruned already and shared instead of built again
         """
+        # the reductions keep the optimum and the frustration index, only the solution vectors are shorter
+        self.kernel = Kernelization(dataset.graph) if kernelize else None
+        # the graph given, the lower bound is computed on it, see __termination()
+        self.__source_graph = dataset.graph
+        if self.kernel is not None:
+            dataset = self.kernel.dataset()
         self._dataset = dataset
-        self.neighborhood = Neighborhood(dataset=dataset)
-        self.objective_function = Frustration(dataset)
+        # the nodes pruned from a shared neighborhood have no edges left, so they are found again as alone
+        self.neighborhood = Neighborhood(dataset=dataset) if neighborhood is None else neighborhood
         self.node_available = self.__pretreatment()
-        self.local_search = LocalSearch(self.objective_function, self.neighborhood, self.node_available)
+        self.objective_function = Frustration(dataset, graph=self.neighborhood.graph)
+        self.batch_evaluator = BatchMoveEvaluator(self.neighborhood.graph) \
+            if batch_moves and utils.np is not None else None
+        self.local_search = LocalSearch(self.objective_function, self.neighborhood, self.node_available,
+                                        batch_evaluator=self.batch_evaluator)
         self.beta = beta
+        self.compact_interval = compact_interval
         self.T = - 1
-
-    def initialization(self, output=True):
+        self.profiler = profiler
+        # a lower bound of the frustration index, set by run()
+        self.lower_bound = None
+        # the best solution of the run so far, kept for the checkpoints
+        self.best_solution = None
+        self.best_value = None
+        if profiler is not None:
+            profiler.attach(self.objective_function)
+
+    def initialization(self, output=True, starts=1, workers=None):
         init = Initialization(self._dataset, self.neighborhood)
-        solution, partition = init.greedy_initialization(self.objective_function)
-        # solution, partition = init.multi_start_greedy_initialization(self.objective_function)
+        if starts > 1:
+            solution, partition = init.multi_start_greedy_initialization(self.objective_function, t=starts,
+                                                                         workers=workers)
+        else:
+            solution, partition = init.greedy_initialization(self.objective_function)
         self.objective_function.set_solution(solution)
         self.objective_function.update_objective_function()
         self.T = self.objective_function.obj_value
@@ -52,69 +85,291 @@ class IteratedGreedy:
         self.__reconstruction(destruction_nodes)
 
     def acceptance_criterion(self, status, alpha=0.99, method='metropolis'):
+        # a rejected solution is rolled back to the checkpoint of record_status(), an accepted one is committed
         obj = self.objective_function
-        last_solution = status['solution']
         last_value = status['value']
         if method == 'better':
             if last_value < obj.obj_value:
-                obj.set_solution(last_solution)
-                obj.obj_value = last_value
+                obj.rollback()
+            else:
+                obj.commit()
         else:
 
             if last_value < obj.obj_value and rd.random() > math.exp((last_value - obj.obj_value) / self.T):
-                obj.set_solution(last_solution)
-                obj.obj_value = last_value
+                obj.rollback()
+            else:
+                obj.commit()
         self.T *= alpha
 
-    def run(self, max_iter=2000, output=True, multi_start=False):
+    def migrate(self, solution, value, method='better'):
+        """
+        consider an incoming solution, e.g. the elite of another island, under the acceptance criterion
+
+        :param solution: the incoming solution vector
+        :param value: objective function value of the incoming solution
+        :param method: enum {"better", "metropolis"}
+        :return: True if the solution is adopted
+        """
+
+        obj = self.objective_function
+        if value < obj.obj_value or \
+                (method != 'better' and self.T > 0 and rd.random() < math.exp((obj.obj_value - value) / self.T)):
+            obj.set_solution(list(solution))
+            obj.obj_value = value
+            return True
+        return False
+
+    def iterate(self, method='better'):
+        """
+        one iteration of IG: destruction, reconstruction, local search and acceptance
+
+        :param method: acceptance criterion, enum {"better", "metropolis"}
+        :return: None
+        """
+
+        if self.profiler is not None:
+            self.__iterate_profiled(method)
+            return
+
+        ls = self.local_search
+        status = self.record_status()
+        self.destruction_and_reconstruction()
+        ls.local_move(incremental=True)
+        ls.community_merge()
+        self.acceptance_criterion(status, method=method)
+
+    def __iterate_profiled(self, method):
+        # the same steps as iterate(), timed phase by phase
+        prof = self.profiler
+        ls = self.local_search
+        obj = self.objective_function
+        prof.begin_iteration(len(prof.records))
+
+        prof.phase('checkpoint')
+        status = self.record_status()
+        prof.phase('destruction')
+        destruction_nodes = self.__destruction()
+        prof.phase('reconstruction')
+        self.__reconstruction(destruction_nodes)
+        prof.phase('local_move')
+        ls.local_move(incremental=True)
+        prof.count('passes', ls.passes)
+        prof.count('visits', ls.visits)
+        prof.phase('community_merge')
+        ls.community_merge()
+        candidate_value = obj.obj_value
+        prof.phase('acceptance')
+        self.acceptance_criterion(status, method=method)
+
+        prof.end_iteration(obj.obj_value, candidate_value)
+
+    def run(self, max_iter=2000, output=True, multi_start=False, termination: Termination = None, lower_bound=None,
+            checkpoint_path=None, checkpoint_interval=10):
+        """
+        run IG until max_iter iterations are done or the termination condition is met
+
+        :param max_iter: max number of iterations, None: limited by the termination condition only
+        :param output: print the progress
+        :param multi_start: the solution is initialized in advance (multi start or warm_start()),
+                            skip the initialization
+        :param termination: optional, e.g. TimeBudget(60) | Stagnation(iterations=100) | TargetValue(2184)
+        :param lower_bound: optional, a lower bound of the frustration index, or True to compute one by
+                            CyclePackingBound, the run stops as 'optimal' when the best value reaches it
+        :param checkpoint_path: optional, a Checkpoint is written to the file every checkpoint_interval iterations
+                                and at the end, see resume()
+        :param checkpoint_interval: number of iterations between two checkpoints
+        :return: best values of the iterations, the reason for stopping
+        """
+
         print("IG is running……")
         start_time = time.time()
+        termination = self.__termination(max_iter, termination, lower_bound, output)
+        prof = self.profiler
+        if prof is not None:
+            prof.begin_iteration(0)
+            prof.phase('initialization')
         if not multi_start:
             self.initialization()
-        abandoned = self._dataset.vnum - len(self.node_available)
-        ct = 1
         ls = self.local_search
+        if prof is not None:
+            prof.phase('local_move')
         ls.local_move()
+        if prof is not None:
+            prof.count('passes', ls.passes)
+            prof.phase('community_merge')
         ls.community_merge()
-        best_values = []
+        if prof is not None:
+            prof.end_iteration(self.objective_function.obj_value)
+        self.best_solution = array.array('i', self.objective_function.solution)
+        self.best_value = self.objective_function.obj_value
+        return self.__search(0, [], termination, start_time, max_iter, output, checkpoint_path, checkpoint_interval)
+
+    def resume(self, path, max_iter=2000, output=True, termination: Termination = None, lower_bound=None,
+               checkpoint_path=None, checkpoint_interval=10):
+        """
+        continue a run from a Checkpoint written by run(), e.g. after the process is preempted
+        The solution, temperature, random state, iteration counter and history are restored, so a run resumed
+        from a periodic checkpoint repeats the iterations of the run that wrote it, as if it was never interrupted.
+
+        :param path: file path of the checkpoint
+        :param max_iter: max number of iterations in total, including the ones before the checkpoint
+        :param output: print the progress
+        :param termination: optional, the condition of the resumed part, see run()
+        :param lower_bound: optional, see run()
+        :param checkpoint_path: where the checkpoints of the resumed part are written, default: path
+        :param checkpoint_interval: number of iterations between two checkpoints
+        :return: best values of all the iterations, the reason for stopping
+        """
 
-        while ct <= max_iter:
+        state = Checkpoint.load(path)
+        if (state.vnum, state.enum) != (self._dataset.vnum, self._dataset.enum) or \
+                sorted(state.node_order) != sorted(self.node_available):
+            raise ValueError('the checkpoint is written for a dataset of %d nodes and %d edges' %
+                             (state.vnum, state.enum))
 
-            status = self.record_status()
-            self.destruction_and_reconstruction()
-            ls.local_move()
-            ls.community_merge()
+        print("IG is resuming from iteration", state.iteration)
+        start_time = time.time()
+        termination = self.__termination(max_iter, termination, lower_bound, output)
 
-            self.acceptance_criterion(status, method='better')
-            # self.acceptance_criterion(status)
-            # if self.objective_function.obj_value < self.best_value:
-            #     self.best_value = self.objective_function.obj_value
-            #     self.best_solution_set = [self.objective_function.solution, self.objective_function.partition]
+        obj = self.objective_function
+        obj.set_solution(state.solution)
+        obj.obj_value = state.value
+        obj.touched = set(state.touched) if state.touched is not None else None
+        # the node list is shared with the local search, its shuffled order is a part of the state
+        self.node_available[:] = state.node_order
+        self.T = state.T
+        self.best_solution, self.best_value = state.best_solution, state.best_value
+        rd.setstate(state.random_state)
+
+        return self.__search(state.iteration, list(state.best_values), termination, start_time, max_iter, output,
+                             checkpoint_path if checkpoint_path is not None else path, checkpoint_interval)
+
+    def warm_start(self, source, output=True):
+        """
+        start from the best solution of a previous run instead of the initialization, run(multi_start=True) next
+
+        :param source: file path of a Checkpoint, or an instance of it
+        :param output: print the initial value
+        :return: None
+        """
+
+        state = Checkpoint.load(source) if isinstance(source, str) else source
+        if state.vnum != self._dataset.vnum:
+            raise ValueError('the checkpoint is written for a dataset of %d nodes' % state.vnum)
+        self.objective_function.set_solution(state.best_solution)
+        # computed again, the edges of the dataset may have changed since the checkpoint
+        self.T = self.objective_function.update_objective_function()
+        if output:
+            print("Warm start from", state.best_value, "->", self.objective_function.obj_value)
+
+    def full_solution(self, solution=None) -> list:
+        """
+        :param solution: optional, a solution vector of the searched graph, default: the current solution
+        :return: the solution list of the dataset given at initialization, lifted from the kernel if kernelized
+        """
+
+        if solution is None:
+            solution = self.objective_function.solution
+        if self.kernel is not None:
+            return self.kernel.lift(solution)
+        return list(solution)
+
+    def save_checkpoint(self, path, iteration, best_values):
+        """
+        write the state of the run as a Checkpoint, between two iterations, the run itself is not changed
+
+        :param path: file path
+        :param iteration: number of iterations done
+        :param best_values: values of the iterations so far
+        :return: the Checkpoint
+        """
+
+        obj = self.objective_function
+        state = Checkpoint(self._dataset.vnum, self._dataset.enum, iteration, obj.solution, obj.obj_value,
+                           self.best_solution, self.best_value, self.T, best_values, rd.getstate(),
+                           touched=obj.touched, node_order=self.node_available)
+        state.save(path)
+        return state
+
+    def __termination(self, max_iter, termination, lower_bound, output):
+        # max_iter and the lower bound are combined with the given condition
+        if max_iter is not None:
+            termination = MaxIterations(max_iter) if termination is None else MaxIterations(max_iter) | termination
+        # started before the bound is computed, so that its time counts against a TimeBudget
+        if termination is not None:
+            termination.start()
+        if lower_bound is True:
+            # the edges left out of the neighborhood graph are never frustrated,
+            # a kernel has the same optimum as the graph given but fewer cycles to pack, so its bound is weaker
+            graph = self.neighborhood.graph if self.kernel is None else self.__source_graph
+            lower_bound = CyclePackingBound(graph).value
+        self.lower_bound = lower_bound
+        if lower_bound is not None:
+            # ProvenOptimal has nothing to start, the combination is not started again
+            optimal = ProvenOptimal(lower_bound)
+            termination = optimal if termination is None else optimal | termination
+            if output:
+                print('Lower bound:', lower_bound)
+        return termination
+
+    def __search(self, ct, best_values, termination, start_time, max_iter, output, checkpoint_path,
+                 checkpoint_interval):
+        """
+        the main loop of run() and resume()
+
+        :param ct: number of iterations done
+        :param best_values: values of the iterations done
+        :return: best values of the iterations, the reason for stopping
+        """
+
+        obj = self.objective_function
+        abandoned = self._dataset.vnum - len(self.node_available)
+        reason = termination.stop(ct, obj.obj_value)
+
+        while reason is None:
+
+            ct += 1
+            self.iterate(method='better')
+            # self.iterate(method='metropolis')
+            if obj.obj_value < self.best_value:
+                self.best_value = obj.obj_value
+                self.best_solution = array.array('i', obj.solution)
 
             if output:
                 current_time = time.time()
                 print("execution time: ", current_time - start_time, "s")
-                print('%d/%d: best value --> %d with %d clusters' %
-                      (ct, max_iter, self.objective_function.obj_value, len(self.objective_function.partition) - abandoned))
+                print('%d/%s: best value --> %d with %d clusters' %
+                      (ct, max_iter, obj.obj_value, len(obj.partition) - abandoned))
                 # print('        current value --> ', self.objective_function.obj_value)
-            best_values.append(self.objective_function.obj_value)
-            ct += 1
+            best_values.append(obj.obj_value)
+            reason = termination.stop(ct, obj.obj_value)
+            if self.compact_interval and ct % self.compact_interval == 0:
+                obj.compact_clusters()
+            if checkpoint_path is not None and (reason is not None or ct % checkpoint_interval == 0):
+                self.save_checkpoint(checkpoint_path, ct, best_values)
 
         end_time = time.time()
         print('IG Complete!')
         print('=' * 40)
-        print('Best Value:', best_values[-1])
+        print('Best Value:', obj.obj_value)
+        if self.lower_bound is not None:
+            print('Lower bound:', self.lower_bound, ', gap:', obj.obj_value - self.lower_bound)
+        print('Stopped by:', reason)
         print('time cost:', end_time - start_time, "s")
-        return best_values
+        if output and self.profiler is not None:
+            print(self.profiler.report())
+        return best_values, reason
 
     def record_status(self):
         """
         for acceptance criterion
+        Note: a checkpoint of the objective function is set instead of copying the solution,
+        the changes after it are recorded and undone by the acceptance criterion if necessary
 
         :return: current partition status
         """
+        self.objective_function.checkpoint()
         status = {
-            'solution': self.objective_function.solution.copy(),
             'value': self.objective_function.obj_value
         }
         return status
@@ -131,7 +386,7 @@ class IteratedGreedy:
         removed_node = rd.sample(self.node_available, int(obj.vnum * self.beta))
 
         for node in removed_node:
-            delta = obj.delta_caused_by_decompose(node, self.neighborhood.neighborhood_structure[node])
+            delta = obj.delta_caused_by_decompose(node, self.neighborhood.graph)
             obj.decompose(node, delta=delta)
 
         return removed_node
@@ -147,33 +402,29 @@ class IteratedGreedy:
         obj = self.objective_function
         nbr = self.neighborhood
 
-        for node in isolated_node:
-            min_delta = 0
-            candidate = -1
-
-            for nbr_community in nbr.get_adjacent_cluster(node, obj.solution):
+        if self.batch_evaluator is not None:
+            self.batch_evaluator.apply(obj, isolated_node, nbr)
+            return
 
-                delta = obj.delta_caused_by_move(node, nbr_community, nbr.neighborhood_structure[node])
-                if delta < min_delta:
-                    min_delta = delta
-                    candidate = nbr_community
+        for node in isolated_node:
+            candidate, min_delta = obj.best_move(node, nbr)
             if candidate != -1:
                 obj.move(node, candidate, min_delta)
 
     def __pretreatment(self):
         alone = set()
         isolated = set()
+        graph = self.neighborhood.graph
 
         for i in range(self._dataset.vnum):
-            if i not in self.neighborhood.neighborhood_structure.keys():
+            if not graph.degree(i):
                 alone.add(i)
                 continue
-            if not self.neighborhood.neighborhood_structure[i]['+']:
+            if not graph.positive_degree(i):
                 isolated.add(i)
-        for node in isolated:
-            for nbr in self.neighborhood.neighborhood_structure[node]["-"]:
-                self.neighborhood.neighborhood_structure[nbr]["-"].remove(node)
-            del self.neighborhood.neighborhood_structure[node]
+        # nodes without positive edges stay alone, their negative edges are never frustrated
+        if isolated:
+            self.neighborhood.remove_nodes(isolated)
 
         node_available = set(range(self._dataset.vnum)) - alone - isolated
         return list(node_available)
@@ -217,7 +468,7 @@ if __name__ == '__main__':
     results = []
     for _ in range(20):
         ig = IteratedGreedy(ds)
-        vs = ig.run(max_iter=200)
+        vs, _ = ig.run(max_iter=200)
         results.append(vs[-1])
         min_iterations.append(get_end_position(vs))
     print(min_iterations)
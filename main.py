@@ -1,44 +1,47 @@
 import iterated_greedy_algorithm as ig
 import signed_utils as utils
+from module.termination import TargetValue, TimeBudget
 # import matplotlib.pyplot as plt
 import time
+import os
 
 
-"""
-# target frustration index:
-# 200: 45
-# 400: 57
-# 600: 109
-# 800: 241
-# 1000: 600
-# 2000: 2184
-# 4000: 6190
-# 8000: 16035
-# 10000: 20527
-"""
+# target frustration index of the slashdot datasets, by size
+TARGETS = {200: 45, 400: 57, 600: 109, 800: 241, 1000: 600, 2000: 2184, 4000: 6190, 8000: 16035, 10000: 20527}
 
 
-def main(path, t=10):
+def main(path, t=10, workers=None, time_budget=None, checkpoint_path=None, kernelize=False):
     # path = "generated_dataset_20_120_6_0.8_0.2_0.5_1619942955.g"
-    dataset = utils.load_data(path)
-
-    # the multi start mechanism of initialization method is implemented here.
-    multi_initialization = []
-    initial_values = []
-
+    dataset = utils.load_data(path, cache=True)
+
+    # stop early when the target of the dataset is reached or the time budget is used up
+    termination = None
+    if dataset.vnum in TARGETS and 'slashdot' in path:
+        termination = TargetValue(TARGETS[dataset.vnum])
+    if time_budget is not None:
+        termination = TimeBudget(time_budget) if termination is None else termination | TimeBudget(time_budget)
+
+    # a preempted run continues from its last checkpoint
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        alg = ig.IteratedGreedy(dataset=dataset, beta=0.3, kernelize=kernelize)
+        best_values, reason = alg.resume(checkpoint_path, max_iter=150, output=True, termination=termination,
+                                         lower_bound=True)
+        print(best_values)
+        return best_values[-1] if best_values else alg.objective_function.obj_value
+
+    # the multi start mechanism of initialization method, the t starts run on a process pool
     ts = time.time()
-    for i in range(t):
-        print("initializing:", i + 1, "/", t)
-        multi_alg = ig.IteratedGreedy(dataset=dataset, beta=0.3)
-        multi_alg.initialization(output=False)
-        multi_initialization.append(multi_alg)
-        initial_values.append(multi_alg.objective_function.obj_value)
+    print("initializing:", t, "starts")
+    alg = ig.IteratedGreedy(dataset=dataset, beta=0.3, kernelize=kernelize)
+    if alg.kernel is not None:
+        # the search runs on the kernel, alg.full_solution() is the solution of the dataset
+        print("Kernel:", alg.kernel.summary())
+    alg.initialization(output=False, starts=t, workers=workers)
     te = time.time()
     print("Initialization cost:", te - ts, "s")
 
-    b = initial_values.index(min(initial_values))
-    alg = multi_initialization[b]
-    best_values = alg.run(max_iter=150, output=True, multi_start=True)
+    best_values, reason = alg.run(max_iter=150, output=True, multi_start=True, termination=termination,
+                                  lower_bound=True, checkpoint_path=checkpoint_path)
     print(best_values)
     return best_values[-1]
     # plt.plot([t * 0.1 for t in range(700)], best_values)
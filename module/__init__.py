@@ -3,6 +3,14 @@ from .local_search import LocalSearch
 from .neighborhood import Neighborhood
 from .initialization import Initialization
 from .objective_function import ObjectiveFunction
+from .vectorized import FrustrationEvaluator, BatchMoveEvaluator
+from .cluster_allocator import ClusterIdAllocator
+from .profiler import Profiler
+from .kernelization import Kernelization
+from .lower_bound import CyclePackingBound
+from .checkpoint import Checkpoint
+from .termination import Termination, MaxIterations, TimeBudget, Stagnation, TargetValue, ProvenOptimal, AnyOf, \
+    AllOf
 
 
 """
@@ -11,8 +19,13 @@ The data structure of this program is agreed here.
     * A list is the best.
     example: self.solution = {i: i for i in range(n)}
              self.solution = [0] * n
-2. The partition is described by a dict with numbers as keys and sets as values.
-    example: self.partition = {0: {0, 1, 2}, 1: {3, 4, 5}, 2: {6}}
-3. The dataset is represented by a two-dimensional default dict.
-    example: defaultdict(lambda: defaultdict(lambda: 0))
+2. The partition is described by a signed_utils.Partition, flat arrays indexed by node and by cluster id.
+    It reads like a dict: partition[cid] is a view of the members, partition.items() yields (cid, view).
+    The solution vector of an ObjectiveFunction is partition.label, changed only through move() and merge().
+    example: self.partition = utils.Partition.from_solution([0, 0, 0, 1, 1, 1, 2])
+3. The dataset is represented by a SignedGraph in CSR form (see signed_utils.SignedGraph).
+    example: the positive neighbors of node i are graph.neighbor[graph.offset[i]:graph.split[i]],
+             the negative ones are graph.neighbor[graph.split[i]:graph.offset[i + 1]]
+    The search reads the graph through graph.positive_neighbors(i), graph.negative_neighbors(i) and graph.neighbors(i),
+    so a DynamicSignedGraph, changed edge by edge, is read the same way (see dynamic_solver.DynamicSolver).
 """
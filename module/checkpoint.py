@@ -0,0 +1,126 @@
+import os
+import sys
+import array
+import struct
+
+
+# magic, version, byte order, vnum, enum, iteration, value, best value, T, length of the history,
+# number of touched nodes (-1: unknown), length of the node order, version of the random state,
+# gauss_next is set, gauss_next
+_CHECKPOINT_HEADER = struct.Struct('<4sBc2xqqqqqdqqqq?7xd')
+_CHECKPOINT_MAGIC = b'IGC\x00'
+_CHECKPOINT_VERSION = 1
+# the internal state of random.Random, 624 words and the position in them
+_RANDOM_STATE_LENGTH = 625
+
+
+class Checkpoint:
+    """
+    The class of a snapshot of an IG run,
+    everything needed to continue it or to start a new run from its best solution.
+    Layout: header | solution, best solution, touched nodes, node order (int32) | random state (uint32) |
+            best values (int64)
+    The file is written to a temporary file first and then renamed, so a reader never sees a partial file.
+    """
+
+    def __init__(self, vnum, enum, iteration, solution, value, best_solution, best_value, T, best_values,
+                 random_state, touched=None, node_order=None):
+        """
+        :param vnum: num of vertices of the dataset
+        :param enum: num of edges of the dataset
+        :param iteration: number of iterations done
+        :param solution: the current solution vector
+        :param value: objective function value of the current solution
+        :param best_solution: the best solution vector found
+        :param best_value: objective function value of the best solution
+        :param T: temperature of the acceptance criterion
+        :param best_values: values of the iterations so far
+        :param random_state: random.getstate()
+        :param touched: optional, nodes to be revisited by the incremental local search, None if unknown
+        :param node_order: optional, the order in which the local search visits the nodes, it is shuffled once per run
+        """
+
+        self.vnum, self.enum = vnum, enum
+        self.iteration = iteration
+        self.solution = array.array('i', solution)
+        self.value = value
+        self.best_solution = array.array('i', best_solution)
+        self.best_value = best_value
+        self.T = T
+        self.best_values = array.array('q', best_values)
+        self.random_state = random_state
+        self.touched = array.array('i', sorted(touched)) if touched is not None else None
+        self.node_order = array.array('i', node_order) if node_order is not None else array.array('i')
+
+    def save(self, path: str, sync=True):
+        """
+        write the checkpoint in the binary format
+
+        :param path: file path
+        :param sync: flush the file to the disk before it replaces the previous one
+        :return: path
+        """
+
+        version, words, gauss_next = self.random_state
+        header = _CHECKPOINT_HEADER.pack(_CHECKPOINT_MAGIC, _CHECKPOINT_VERSION, sys.byteorder[0].encode(),
+                                         self.vnum, self.enum, self.iteration, self.value, self.best_value, self.T,
+                                         len(self.best_values), len(self.touched) if self.touched is not None else -1,
+                                         len(self.node_order), version, gauss_next is not None, gauss_next or 0.0)
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(self.solution)
+            f.write(self.best_solution)
+            if self.touched is not None:
+                f.write(self.touched)
+            f.write(self.node_order)
+            f.write(array.array('I', words))
+            f.write(self.best_values)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'Checkpoint':
+        """
+        read a checkpoint written by save()
+
+        :param path: file path
+        :return: an instance of class Checkpoint
+        """
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _CHECKPOINT_HEADER.size:
+            raise ValueError('%s is not a checkpoint' % path)
+
+        magic, version, byteorder, vnum, enum, iteration, value, best_value, T, history, touched, order, \
+            random_version, has_gauss, gauss_next = _CHECKPOINT_HEADER.unpack_from(data)
+        if magic != _CHECKPOINT_MAGIC or version != _CHECKPOINT_VERSION:
+            raise ValueError('%s is not a checkpoint of this version' % path)
+        if byteorder != sys.byteorder[0].encode():
+            raise ValueError('%s is written on a platform of another byte order' % path)
+
+        layout = (('i', vnum), ('i', vnum), ('i', max(touched, 0)), ('i', order), ('I', _RANDOM_STATE_LENGTH),
+                  ('q', history))
+        arrays = []
+        position = _CHECKPOINT_HEADER.size
+        for typecode, length in layout:
+            values = array.array(typecode)
+            size = length * values.itemsize
+            if position + size > len(data):
+                raise ValueError('%s is truncated' % path)
+            values.frombytes(data[position:position + size])
+            arrays.append(values)
+            position += size
+        if position != len(data):
+            raise ValueError('%s has trailing data' % path)
+        solution, best_solution, touched_nodes, node_order, words, best_values = arrays
+
+        random_state = (random_version, tuple(words), gauss_next if has_gauss else None)
+        return cls(vnum, enum, iteration, solution, value, best_solution, best_value, T, best_values, random_state,
+                   touched=touched_nodes if touched >= 0 else None, node_order=node_order)
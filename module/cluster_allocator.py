@@ -0,0 +1,72 @@
+import heapq
+
+
+class ClusterIdAllocator:
+    """
+    The class of the allocator of cluster ids.
+    The ids released by emptied clusters are reused, the smallest first, so the ids stay in a dense range
+    [0, capacity) and per-cluster data can be stored in flat arrays.
+    """
+
+    def __init__(self, used=()):
+        """
+        class initialization
+
+        :param used: the ids of the existing clusters, non-negative ints
+        """
+
+        used = set(used)
+        self.capacity = max(used) + 1 if used else 0
+        self.__free = set(range(self.capacity)) - used
+        self.__heap = sorted(self.__free)
+
+    def allocate(self) -> int:
+        """
+        :return: the smallest free id, O(log n)
+        """
+
+        while self.__heap:
+            cid = heapq.heappop(self.__heap)
+            # the heap is cleaned lazily, ids reserved after their release are skipped
+            if cid in self.__free:
+                self.__free.remove(cid)
+                return cid
+
+        cid = self.capacity
+        self.capacity += 1
+        return cid
+
+    def release(self, cid):
+        """
+        give back the id of an emptied cluster
+
+        :param cid: number of cluster
+        :return: None
+        """
+
+        if cid in self.__free:
+            return
+        self.__free.add(cid)
+        heapq.heappush(self.__heap, cid)
+        if len(self.__heap) > 2 * self.capacity:
+            self.__heap = sorted(self.__free)
+
+    def reserve(self, cid):
+        """
+        mark an id as used, e.g. a removed cluster is restored by a rollback
+
+        :param cid: number of cluster
+        :return: None
+        """
+
+        if cid >= self.capacity:
+            for free_cid in range(self.capacity, cid):
+                self.__free.add(free_cid)
+                heapq.heappush(self.__heap, free_cid)
+            self.capacity = cid + 1
+        else:
+            self.__free.discard(cid)
+
+    def __len__(self):
+        # number of ids in use
+        return self.capacity - len(self.__free)
@@ -1,32 +1,63 @@
-
 import signed_utils as utils
 from module.objective_function import ObjectiveFunction
+from module.vectorized import FrustrationEvaluator
 
 
 class Frustration(ObjectiveFunction):
     """
     The class of the frustration, implements ObjectiveFunction.
+
+    A connectivity table is maintained along with the partition:
+        self.links[node] = {cluster_id: [positive edges, negative edges]} for every cluster adjacent to the node,
+    including its own cluster. It is updated by move(), merge() and decompose(), so the deltas are read in O(1).
+    So is the quotient graph of the partition:
+        self.cluster_links[c1] = {c2: positive edges - negative edges between c1 and c2}, pairs with a zero weight
+    are not stored because merging them never changes the frustration index.
     """
 
+    def __init__(self, dataset: utils.Dataset, init_solution=None, graph: utils.SignedGraph = None):
+        self.links = None
+        self.cluster_links = None
+        self.__evaluator = None
+        super().__init__(dataset, init_solution=init_solution, graph=graph)
+        self.__build_links()
+
+    def set_solution(self, solution):
+        """
+        set the solution vector and partition, the connectivity tables are rebuilt, O(m)
+
+        :param solution: the solution vector
+        :return: None
+        """
+        super().set_solution(solution)
+        self.__build_links()
+
     def objective_function(self):
         """
         calculate the line index of structural balance using a solution vector, O(m)
+        Note: vectorized by FrustrationEvaluator when numpy is available
 
         :return: frustration index
         """
 
-        data = self._dataset.data
+        if utils.np is not None and isinstance(self._dataset.graph, utils.SignedGraph):
+            if self.__evaluator is None:
+                self.__evaluator = FrustrationEvaluator(self._dataset.graph)
+            return self.__evaluator.evaluate(self.solution)
+
+        g = self._dataset.graph
         sl = self.solution
         frustration = 0
 
         for node in range(self._dataset.vnum):
             cid = sl[node]
-            for nbr, attr in data[node].items():
-                # negative edges within clusters
-                if sl[nbr] == cid and attr == -1:
+            # positive edges between clusters
+            for nbr in g.positive_neighbors(node):
+                if sl[nbr] != cid:
                     frustration += 1
-                # positive edges between clusters
-                elif sl[nbr] != cid and attr == 1:
+            # negative edges within clusters
+            for nbr in g.negative_neighbors(node):
+                if sl[nbr] == cid:
                     frustration += 1
 
         assert frustration % 2 == 0
@@ -37,7 +68,7 @@ class Frustration(ObjectiveFunction):
         calculate the line index of structural balance using a partition, more effective
 
         :param partition: a given partition, default: current partition
-        :param neighborhood: neighborhood structure need to be given in advance
+        :param neighborhood: the graph of the neighborhood structure need to be given in advance
         :return: frustration index
         """
 
@@ -51,50 +82,66 @@ class Frustration(ObjectiveFunction):
 
             # calculate the frustration for each cluster
             for node in community:
-                node_nbr = neighborhood[node]
-                pos_out += len(node_nbr['+'] - community)
-                neg_in += len(community & node_nbr['-'])
+                pos_out += len([v for v in neighborhood.positive_neighbors(node) if v not in community])
+                neg_in += len([v for v in neighborhood.negative_neighbors(node) if v in community])
 
             frustrations[cid] = pos_out + neg_in
 
         return sum(frustrations.values()) // 2
 
-    def delta_caused_by_move(self, node, destination, node_neighborhood):
+    def delta_caused_by_move(self, node, destination, neighborhood=None):
         """
         calculate the change of frustration index when a node is moved from its current cluster to destination cluster
+        O(1), read from the connectivity table
 
         :param node: number of node
-        :param node_neighborhood: neighborhood of node
         :param destination: target cluster
+        :param neighborhood: unused, kept for the interface of ObjectiveFunction
         :return: change of frustration index, negative if better
         """
 
-        delta = 0
         current_cluster = self.solution[node]
 
         if current_cluster == destination:
             return 0
 
-        for v in node_neighborhood['+']:
-            cid = self.solution[v]
-            # positive edges are expected within clusters
-            if cid != current_cluster and cid == destination:
-                # the frustration index decreases if positive edges are moved into clusters
-                delta -= 1
-            elif cid == current_cluster and cid != destination:
-                delta += 1
-
-        for v in node_neighborhood['-']:
-            cid = self.solution[v]
-            # negative edges are expected between clusters
-            if cid != current_cluster and cid == destination:
-                # the frustration index increases if negative edges are moved into clusters
-                delta += 1
-            elif cid == current_cluster and cid != destination:
-                delta -= 1
+        links = self.links[node]
+        delta = 0
+        # positive edges are expected within clusters, negative edges are expected between clusters
+        current = links.get(current_cluster)
+        if current is not None:
+            delta += current[0] - current[1]
+        target = links.get(destination)
+        if target is not None:
+            delta -= target[0] - target[1]
 
         return delta
 
+    def best_move(self, node, neighborhood=None):
+        """
+        find the adjacent cluster which decreases the frustration index most, O(#adjacent clusters)
+        Note: ties go to the smaller cluster id, so the choice does not depend on the order of the table
+
+        :param node: number of node
+        :param neighborhood: unused, kept for the interface of ObjectiveFunction
+        :return: (candidate cluster, delta), candidate is -1 if no move improves
+        """
+
+        links = self.links[node]
+        current_cluster = self.solution[node]
+        current = links.get(current_cluster)
+        base = current[0] - current[1] if current is not None else 0
+
+        min_delta = 0
+        candidate = -1
+        for cid, (pos, neg) in links.items():
+            delta = base - pos + neg
+            if (delta < min_delta or delta == min_delta and cid < candidate) and cid != current_cluster:
+                min_delta = delta
+                candidate = cid
+
+        return candidate, min_delta
+
     def move(self, node, destination, delta):
         """
         move the node into the destination cluster
@@ -107,43 +154,61 @@ class Frustration(ObjectiveFunction):
         """
 
         pre_cid = self.solution[node]
-
-        self.solution[node] = destination
-        self.partition[pre_cid].remove(node)
-        if not self.partition[pre_cid]:
-            del self.partition[pre_cid]
-        self.partition[destination].add(node)
+        if self._journal is not None:
+            self._journal.append(('move', node, pre_cid))
+
+        partition = self.partition
+        new_cluster = destination not in partition
+        partition.move(node, destination)
+        if self.touched is not None:
+            self.touched.add(node)
+        if new_cluster:
+            self.cluster_ids.reserve(destination)
+        if pre_cid not in partition:
+            self.cluster_ids.release(pre_cid)
+        self.__relink(node, pre_cid, destination)
+        self.__relink_cluster(node, pre_cid, destination)
+        if pre_cid not in self.partition:
+            self.cluster_links.pop(pre_cid, None)
 
         self.obj_value += delta
 
-    def delta_caused_by_merge(self, c1, c2, neighborhood):
+    def delta_caused_by_merge(self, c1, c2, neighborhood=None):
         """
         calculate the change of frustration index when cluster c1 and cluster c2 are merged
+        O(1), read from the quotient graph
 
         :param c1: number of cluster
         :param c2: number of cluster
-        :param neighborhood: the whole neighborhood structure
+        :param neighborhood: unused, kept for the interface of ObjectiveFunction
         :return: change of frustration index, negative if better
         """
 
-        c1_community, c2_community = self.partition[c1], self.partition[c2]
-        data = self._dataset.data
-        delta = 0
+        # positive edges between c1 and c2 are satisfied after merging, negative ones are frustrated
+        return -self.cluster_links.get(c1, {}).get(c2, 0)
 
-        for node in c1_community:
-            intersection = (neighborhood[node]['+'] | neighborhood[node]['-']) & c2_community
+    def best_merge(self, cid, neighborhood=None):
+        """
+        find the adjacent cluster which decreases the frustration index most when merged, O(#adjacent clusters)
+        Note: ties go to the smaller cluster id, see best_move()
+
+        :param cid: number of cluster
+        :param neighborhood: unused, kept for the interface of ObjectiveFunction
+        :return: (candidate cluster, delta), candidate is -1 if no merge improves
+        """
 
-            for another_node in intersection:
-                if data[node][another_node] == 1:
-                    delta -= 1
-                elif data[node][another_node] == -1:
-                    delta += 1
+        max_weight = 0
+        candidate = -1
+        for c2, weight in self.cluster_links.get(cid, {}).items():
+            if weight > max_weight or weight == max_weight and c2 < candidate:
+                max_weight = weight
+                candidate = c2
 
-        return delta
+        return candidate, -max_weight
 
     def merge(self, c1, c2, delta):
         """
-        merge cluster c2 into c1
+        merge cluster c2 into c1, O(volume of c2)
         Note: the cluster c2 is removed after the operation
 
         :param c1: number of cluster
@@ -152,39 +217,42 @@ class Frustration(ObjectiveFunction):
         :return: None
         """
 
-        for node in self.partition[c2]:
-            self.solution[node] = c1
+        nodes = list(self.partition[c2])
+        if self._journal is not None:
+            self._journal.append(('merge', c2, nodes))
 
-        self.partition[c1] = self.partition[c1] | self.partition[c2]
-        del self.partition[c2]
+        self.partition.merge(c1, c2)
+        for node in nodes:
+            self.__relink(node, c2, c1)
+        if self.touched is not None:
+            self.touched.update(nodes)
+        self.cluster_ids.release(c2)
+
+        # the edges of c2 are taken over by c1, the edges between them become internal
+        for cid, weight in self.cluster_links.pop(c2, {}).items():
+            del self.cluster_links[cid][c2]
+            if cid != c1:
+                self.__add_cluster_weight(c1, cid, weight)
 
         self.obj_value += delta
 
-    def delta_caused_by_decompose(self, node, node_neighborhood):
+    def delta_caused_by_decompose(self, node, neighborhood=None):
         """
-        calculate the change of frustration index when a node is moved out
+        calculate the change of frustration index when a node is moved out, O(1)
 
         :param node: number of node
-        :param node_neighborhood: neighborhood of node
+        :param neighborhood: unused, kept for the interface of ObjectiveFunction
         :return: change of frustration index, negative if better
         """
 
         cid = self.solution[node]
-        if len(self.partition[cid]) == 1:
+        if self.partition.size[cid] == 1:
             return 0
 
-        delta_pos = len([v for v in node_neighborhood['+'] if self.solution[v] == cid])
-        delta_neg = len([v for v in node_neighborhood['-'] if self.solution[v] == cid])
-        delta = 0
-        for v in node_neighborhood['+']:
-            if self.solution[v] == cid:
-                delta += 1
-        for v in node_neighborhood['-']:
-            if self.solution[v] == cid:
-                delta -= 1
-
-        assert delta == delta_pos - delta_neg
-        return delta
+        current = self.links[node].get(cid)
+        if current is None:
+            return 0
+        return current[0] - current[1]
 
     def decompose(self, node, delta):
         """
@@ -199,16 +267,168 @@ class Frustration(ObjectiveFunction):
             return
 
         pre_cid = self.solution[node]
-        cid_available = node
-        while cid_available in self.partition.keys():
-            cid_available += 1
+        cid_available = self.cluster_ids.allocate()
+        if self._journal is not None:
+            self._journal.append(('move', node, pre_cid))
 
-        self.partition[cid_available] = {node}
-        self.partition[pre_cid].remove(node)
-        self.solution[node] = cid_available
+        self.partition.move(node, cid_available)
+        if self.touched is not None:
+            self.touched.add(node)
+        self.__relink(node, pre_cid, cid_available)
+        self.__relink_cluster(node, pre_cid, cid_available)
 
         self.obj_value += delta
 
+    def insert_edge(self, n1, n2, attr):
+        """
+        update the connectivity tables and the frustration index for an edge inserted into the graph, O(1)
+        Note: the graph itself is changed by the caller (see DynamicSignedGraph), the operation is not recorded
+              by checkpoint()
+
+        :param n1: number of node
+        :param n2: number of node
+        :param attr: sign of the edge, 1 or -1
+        :return: None
+        """
+
+        self.__count_edge(n1, n2, attr, 1)
+
+    def remove_edge(self, n1, n2, attr):
+        """
+        update the connectivity tables and the frustration index for an edge removed from the graph, O(1)
+        Note: see insert_edge()
+
+        :param n1: number of node
+        :param n2: number of node
+        :param attr: sign of the removed edge, 1 or -1
+        :return: None
+        """
+
+        self.__count_edge(n1, n2, attr, -1)
+
+    def __count_edge(self, n1, n2, attr, step):
+        # step 1 adds the edge to the tables, step -1 takes it away
+        idx = 0 if attr == 1 else 1
+        c1, c2 = self.solution[n1], self.solution[n2]
+        for node, cid in ((n1, c2), (n2, c1)):
+            links = self.links[node]
+            counter = links.get(cid)
+            if counter is None:
+                counter = links[cid] = [0, 0]
+            counter[idx] += step
+            if not counter[0] and not counter[1]:
+                del links[cid]
+        if c1 != c2:
+            self.__add_cluster_weight(c1, c2, attr * step)
+
+        # positive edges between clusters and negative edges within clusters are frustrated
+        if (c1 == c2) != (attr == 1):
+            self.obj_value += step
+        if self.touched is not None:
+            self.touched.add(n1)
+            self.touched.add(n2)
+
+    def __build_links(self):
+        """
+        construct the connectivity table of the current solution, O(m)
+
+        :return: None
+        """
+
+        g = self._graph
+        sl = self.solution
+        self.links = [dict() for _ in range(g.vnum)]
+        self.cluster_links = {cid: dict() for cid in self.partition}
+
+        for node, links in enumerate(self.links):
+            for v in g.positive_neighbors(node):
+                counter = links.setdefault(sl[v], [0, 0])
+                counter[0] += 1
+            for v in g.negative_neighbors(node):
+                counter = links.setdefault(sl[v], [0, 0])
+                counter[1] += 1
+
+            # the weight between two clusters is summed over the nodes of either side
+            if links:
+                cid = sl[node]
+                row = self.cluster_links[cid]
+                for another_cid, (pos, neg) in links.items():
+                    if another_cid != cid:
+                        row[another_cid] = row.get(another_cid, 0) + pos - neg
+
+        for row in self.cluster_links.values():
+            for cid in [c for c, weight in row.items() if not weight]:
+                del row[cid]
+
+    def __relink(self, node, source, destination):
+        """
+        update the connectivity table of the neighbors when a node is moved from source to destination, O(deg)
+
+        :param node: number of node
+        :param source: the previous cluster of the node
+        :param destination: the current cluster of the node
+        :return: None
+        """
+
+        g = self._graph
+
+        # idx 0 counts positive edges, idx 1 counts negative edges
+        for idx, nbrs in ((0, g.positive_neighbors(node)), (1, g.negative_neighbors(node))):
+            for v in nbrs:
+                links = self.links[v]
+                counter = links[source]
+                counter[idx] -= 1
+                if not counter[0] and not counter[1]:
+                    del links[source]
+                counter = links.get(destination)
+                if counter is None:
+                    links[destination] = [1, 0] if idx == 0 else [0, 1]
+                else:
+                    counter[idx] += 1
+
+    def __relink_cluster(self, node, source, destination):
+        """
+        update the quotient graph when a node is moved from source to destination, O(#adjacent clusters)
+        Note: the connectivity table of the node itself is not changed by its own move
+
+        :param node: number of node
+        :param source: the previous cluster of the node
+        :param destination: the current cluster of the node
+        :return: None
+        """
+
+        for cid, (pos, neg) in self.links[node].items():
+            weight = pos - neg
+            if not weight:
+                continue
+            # edges into the source cluster become external, edges into the destination become internal
+            if cid != source:
+                self.__add_cluster_weight(source, cid, -weight)
+            if cid != destination:
+                self.__add_cluster_weight(destination, cid, weight)
+
+    def __add_cluster_weight(self, c1, c2, weight):
+        """
+        add a weight to the edge between c1 and c2 of the quotient graph, the edge is removed at zero
+
+        :return: None
+        """
+
+        cl = self.cluster_links
+        row1 = cl.get(c1)
+        if row1 is None:
+            row1 = cl[c1] = dict()
+        row2 = cl.get(c2)
+        if row2 is None:
+            row2 = cl[c2] = dict()
+
+        weight += row1.get(c2, 0)
+        if weight:
+            row1[c2] = row2[c1] = weight
+        else:
+            del row1[c2]
+            del row2[c1]
+
 
 if __name__ == "__main__":
 
@@ -220,18 +440,3 @@ if __name__ == "__main__":
     print(fru.obj_value)
 
     print(ds.vnum, ds.enum)
-
-    # test cases
-    # import structure_balance.neighborhood as test_neighborhood
-    # nbr = test_neighborhood.Neighborhood(ds)
-    # positive_edges = sum([len(v['+']) for k, v in nbr.neighborhood_structure.items()])
-    # negative_edges = sum([len(v['-']) for k, v in nbr.neighborhood_structure.items()])
-    # print('positive:', positive_edges)
-    # print('negative:', negative_edges)
-    # print('total edges:', positive_edges + negative_edges)
-
-    # print(nbr.neighborhood_structure[0])
-    # d = fru.delta_caused_by_move(0, 5, nbr.neighborhood_structure[0])
-    # fru.move(0, 5, d)
-    # print(fru.frustration)
-    # print(fru.line_index())
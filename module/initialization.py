@@ -1,6 +1,35 @@
 import random as rd
+import concurrent.futures
 import signed_utils as utils
+from module.frustration import Frustration
 from module.local_search import LocalSearch
+from module.neighborhood import Neighborhood
+
+
+# the dataset and the pretreated graph shared by the starts of a worker process
+_worker_state = {}
+
+
+def _init_worker(dataset, graph):
+    _worker_state['dataset'] = dataset
+    _worker_state['graph'] = graph
+
+
+def _greedy_start(seed):
+    """
+    one start of the multi start initialization, executed in a worker process
+
+    :param seed: seed of the random generator used by this start
+    :return: (solution vector as a list, frustration index)
+    """
+
+    rd.seed(seed)
+    dataset, graph = _worker_state['dataset'], _worker_state['graph']
+    neighborhood = Neighborhood(dataset)
+    neighborhood.graph = graph
+    obj_function = Frustration(dataset, graph=graph)
+    solution, _ = Initialization(dataset, neighborhood).greedy_initialization(obj_function)
+    return [solution[i] for i in range(dataset.vnum)], obj_function.obj_value
 
 
 class Initialization:
@@ -30,20 +59,40 @@ class Initialization:
         :return: solution: list or dict, partition: dict(cluster_id: set())
         """
 
-        _, node_available = utils.check_node_list(obj_function.vnum, self.neighborhood.neighborhood_structure)
+        _, node_available = utils.check_node_list(obj_function.vnum, self.neighborhood.graph)
         method = LocalSearch(obj_function=obj_function, neighborhood=self.neighborhood, node_available=node_available)
         method.local_move()
         method.objective_function.update_objective_function()
         return method.objective_function.solution, method.objective_function.partition
 
-    def multi_start_greedy_initialization(self):
+    def multi_start_greedy_initialization(self, obj_function, t=10, workers=None, seed=None):
         """
         greedy initialization is cheap, multi start initialization for better performance
+        The starts run on a process pool, only the solution vectors and the values are sent back.
+        Note: the best solution is set to obj_function
 
-        :return: list or dict, partition: dict(cluster_id: set())
+        :param obj_function: the greedy function
+        :param t: number of starts
+        :param workers: number of worker processes, default: number of CPUs, 1: run in the current process
+        :param seed: base seed of the starts, start i uses seed + i, default: drawn from the random module
+        :return: solution: list, partition: dict(cluster_id: set())
         """
 
-        best_solution, best_partition = None, None
-        best_value = 2 ** 64
-        # This method was removed because of some bugs.
-        return best_solution, best_partition
+        if seed is None:
+            seed = rd.randrange(2 ** 32)
+        seeds = [seed + i for i in range(t)]
+        graph = self.neighborhood.graph
+
+        if workers == 1 or t == 1:
+            _init_worker(self._dataset, graph)
+            results = [_greedy_start(s) for s in seeds]
+            _worker_state.clear()
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                        initargs=(self._dataset, graph)) as executor:
+                results = list(executor.map(_greedy_start, seeds))
+
+        best_solution, best_value = min(results, key=lambda x: x[1])
+        obj_function.set_solution(best_solution)
+        obj_function.obj_value = best_value
+        return obj_function.solution, obj_function.partition
@@ -0,0 +1,117 @@
+import array
+import collections
+import signed_utils as utils
+
+
+class Kernelization:
+    """
+    The class of the reductions of a graph before the search.
+    Nodes whose placement is optimal whatever the rest of the partition is are removed one by one:
+        * 'alone': no positive edge, the node is a cluster by itself, none of its edges is frustrated
+        * 'pendant': a single positive edge, the node joins its neighbor, repeated this removes positive trees
+        * 'series': two edges and one of them positive, the node is replaced by an edge between its neighbors
+          (positive if both edges are positive, negative otherwise), it frustrates exactly as the node did
+    So the optimum of the reduced graph is the optimum of the graph, and lift() turns a solution of the reduced
+    graph into a solution of the graph with the same frustration index.
+    """
+
+    def __init__(self, graph: utils.SignedGraph, series=True):
+        """
+        class initialization, the reductions are applied until none of them applies
+
+        :param graph: the graph to be reduced
+        :param series: apply the series reduction as well
+        """
+
+        self.vnum = graph.vnum
+        # the removed nodes in order, (rule, node, the neighbor it joins or -1)
+        self.steps = []
+        adj = [dict(graph.signed_neighbors(node)) for node in range(graph.vnum)]
+
+        queue = collections.deque(range(graph.vnum))
+        queued = [True] * graph.vnum
+        removed = [False] * graph.vnum
+        while queue:
+            node = queue.popleft()
+            queued[node] = False
+            if removed[node]:
+                continue
+
+            nbrs = adj[node]
+            positive = [v for v, attr in nbrs.items() if attr == 1]
+            if not positive:
+                step = ('alone', node, -1)
+            elif len(nbrs) == 1:
+                step = ('pendant', node, positive[0])
+            elif series and len(nbrs) == 2:
+                u = positive[0]
+                w = next(v for v in nbrs if v != u)
+                # multiple edges are not representable, u and w must not be adjacent yet
+                if w in adj[u]:
+                    continue
+                adj[u][w] = adj[w][u] = nbrs[w]
+                step = ('series', node, u)
+            else:
+                continue
+
+            self.steps.append(step)
+            removed[node] = True
+            for v in nbrs:
+                del adj[v][node]
+                if not queued[v]:
+                    queued[v] = True
+                    queue.append(v)
+            adj[node] = None
+
+        # the kept nodes are renumbered, node i of the reduced graph is self.nodes[i]
+        self.nodes = [node for node in range(graph.vnum) if not removed[node]]
+        index = {node: i for i, node in enumerate(self.nodes)}
+        us, vs, signs = array.array('i'), array.array('i'), array.array('b')
+        for node in self.nodes:
+            for v, attr in adj[node].items():
+                if node < v:
+                    us.append(index[node])
+                    vs.append(index[v])
+                    signs.append(attr)
+        self.graph = utils.SignedGraph.from_edges(len(self.nodes), us, vs, signs)
+
+    def dataset(self) -> utils.Dataset:
+        """
+        :return: the reduced graph as an instance of class Dataset
+        """
+
+        dataset = utils.Dataset()
+        dataset.vnum, dataset.enum = self.graph.vnum, self.graph.enum
+        dataset.graph = self.graph
+        return dataset
+
+    def lift(self, solution) -> list:
+        """
+        put the removed nodes back in the reverse order of their removal
+
+        :param solution: a solution vector of the reduced graph
+        :return: a solution list of the graph, with the same frustration index
+        """
+
+        full = [-1] * self.vnum
+        for i, node in enumerate(self.nodes):
+            full[node] = solution[i]
+        next_cid = max(full) + 1 if self.nodes else 0
+
+        for rule, node, anchor in reversed(self.steps):
+            if rule == 'alone':
+                full[node] = next_cid
+                next_cid += 1
+            else:
+                # 'series': joining the positive neighbor is optimal whether the two neighbors are together or not
+                full[node] = full[anchor]
+        return full
+
+    def summary(self) -> dict:
+        """
+        :return: dict(rule: number of nodes removed by it), and the sizes before and after
+        """
+
+        counts = collections.Counter(rule for rule, _, _ in self.steps)
+        return {'vnum': self.vnum, 'reduced vnum': len(self.nodes), 'reduced enum': self.graph.enum,
+                'alone': counts['alone'], 'pendant': counts['pendant'], 'series': counts['series']}
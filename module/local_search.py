@@ -1,5 +1,6 @@
 
 import random as rd
+import collections
 from module.objective_function import ObjectiveFunction
 from module.neighborhood import Neighborhood
 
@@ -10,31 +11,49 @@ class LocalSearch:
     Two methods of local search are defined here.
     """
 
-    def __init__(self, obj_function: ObjectiveFunction, neighborhood: Neighborhood, node_available=None):
+    def __init__(self, obj_function: ObjectiveFunction, neighborhood: Neighborhood, node_available=None,
+                 batch_evaluator=None):
         """
         class initialization
 
         :param obj_function: an instance of objective function
         :param neighborhood: neighborhood structure
+        :param batch_evaluator: optional, a BatchMoveEvaluator, the sweeps of local_move() are evaluated in batches
         """
 
         self.objective_function = obj_function
         self.neighborhood = neighborhood
+        self.batch_evaluator = batch_evaluator
         if node_available:
             self.node_list = self.__node_sort(node_available=node_available)
-            self.abandoned = set(range(obj_function.vnum)) - set(self.node_list)
-
-    def local_move(self):
+            self.node_set = set(self.node_list)
+            self.abandoned = set(range(obj_function.vnum)) - self.node_set
+        elif node_available is not None:
+            # no node to search, e.g. the whole graph is removed by Kernelization
+            self.node_list, self.node_set = [], set()
+            self.abandoned = set(range(obj_function.vnum))
+        # work of the last local_move(): sweeps over the node list (rounds of the queue when incremental)
+        # and nodes examined
+        self.passes = 0
+        self.visits = 0
+
+    def local_move(self, incremental=False):
         """
         each node is moved from its current cluster to neighbor clusters
         Note: solution and partition are changed in the iterations
 
+        :param incremental: only revisit the nodes around the changes since the last local search,
+                            see local_move_incremental(), a full sweep is done if they are unknown
         :return: None
         """
 
+        obj = self.objective_function
+        if incremental and obj.touched is not None:
+            self.local_move_incremental()
+            return
+
         improvement = True
         ct = 0
-        obj = self.objective_function
         nbr = self.neighborhood
 
         while improvement:
@@ -44,21 +63,79 @@ class LocalSearch:
 
             if ct >= 100:
                 break
+            if self.batch_evaluator is not None:
+                improvement = self.batch_evaluator.apply(obj, self.node_list, nbr) > 0
+                continue
             for node in self.node_list:
 
-                min_delta = 0
-                candidate = -1
-
-                for nbr_cluster in nbr.get_adjacent_cluster(node, obj.solution):
-                    delta = obj.delta_caused_by_move(node, nbr_cluster, nbr.neighborhood_structure[node])
-                    if delta < min_delta:
-                        min_delta = delta
-                        candidate = nbr_cluster
+                candidate, min_delta = obj.best_move(node, nbr)
 
                 if candidate != -1:
                     obj.move(node, candidate, min_delta)
                     improvement = True
 
+        self.passes = ct
+        self.visits = ct * len(self.node_list)
+        # every node has been checked, only the changes from now on need to be revisited
+        obj.touched = set()
+
+    def local_move_incremental(self, seeds=None):
+        """
+        queue based local move, starting from the nodes whose cluster changed since the last local search
+        (obj_function.touched) and their neighbors. When a node is moved, its neighbors are enqueued again.
+        It stops at the same kind of local optimum as local_move(), with work proportional to the affected region.
+
+        :param seeds: optional, the nodes to start from instead, e.g. the end nodes of changed edges,
+                      whose neighbors keep their deltas
+        :return: the nodes moved
+        """
+
+        obj = self.objective_function
+        g = self.neighborhood.graph
+        available = self.node_set
+
+        if seeds is None:
+            seeds = set()
+            for node in obj.touched:
+                seeds.add(node)
+                seeds.update(g.neighbors(node))
+        seeds = set(seeds) & available
+        obj.touched = set()
+
+        # sorted first, the order of a set depends on its history, e.g. a resumed run rebuilds it
+        queue = sorted(seeds)
+        rd.shuffle(queue)
+        queue = collections.deque(queue)
+        # the same bound as the 100 sweeps of local_move()
+        budget = 100 * len(self.node_list)
+        moved = set()
+        # a round is the queue as it was when the previous round ended, its moves enqueue the next one
+        passes, left = 0, 0
+
+        while queue and budget > 0:
+            if not left:
+                passes += 1
+                left = len(queue)
+            left -= 1
+            budget -= 1
+            node = queue.popleft()
+            seeds.discard(node)
+
+            candidate, min_delta = obj.best_move(node, self.neighborhood)
+            if candidate != -1:
+                obj.move(node, candidate, min_delta)
+                moved.add(node)
+                for v in g.neighbors(node):
+                    if v not in seeds and v in available:
+                        seeds.add(v)
+                        queue.append(v)
+
+        self.passes = passes
+        self.visits = 100 * len(self.node_list) - budget
+        # the nodes moved here are locally optimal or queued until the budget ran out
+        obj.touched = None if queue else set()
+        return moved
+
     def community_merge(self):
         """
         each cluster is attempted to be merged with its neighborhood clusters
@@ -69,7 +146,7 @@ class LocalSearch:
 
         obj = self.objective_function
         nbr = self.neighborhood
-        cluster_list = set(obj.partition.keys()) - self.abandoned
+        cluster_list = sorted(set(obj.partition.keys()) - {obj.solution[node] for node in self.abandoned})
         tabu_list = set()
         # rd.shuffle(cluster_list)
         ct = 0
@@ -81,16 +158,14 @@ class LocalSearch:
             if c1 in tabu_list:
                 continue
 
-            min_delta = 0
-            candidate = -1
-            for c2 in nbr.get_adjacent_cluster_of_cluster(c1, obj.solution, obj.partition):
-                delta = obj.delta_caused_by_merge(c1, c2, nbr.neighborhood_structure)
-                if delta < min_delta:
-                    min_delta = delta
-                    candidate = c2
+            candidate, min_delta = obj.best_merge(c1, nbr)
 
             if candidate != -1:
-                obj.merge(c1, candidate, min_delta)
+                # the smaller cluster is merged into the larger one, the cost is the volume of the removed cluster
+                if obj.partition.size[c1] >= obj.partition.size[candidate]:
+                    obj.merge(c1, candidate, min_delta)
+                else:
+                    obj.merge(candidate, c1, min_delta)
                 tabu_list.add(c1)
                 tabu_list.add(candidate)
 
@@ -115,8 +190,8 @@ class LocalSearch:
 
         if rank_criteria == 'degree':
 
-            nbr = self.neighborhood.neighborhood_structure
-            nbr_len = [(i, len(nbr[i]['+']) + len(nbr[i]['-'])) for i in node_available]
+            g = self.neighborhood.graph
+            nbr_len = [(i, g.degree(i)) for i in node_available]
             nbr_len.sort(key=lambda x: x[1], reverse=True)
             node_available = [x[0] for x in nbr_len]
 
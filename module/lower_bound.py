@@ -0,0 +1,94 @@
+import signed_utils as utils
+
+
+class CyclePackingBound:
+    """
+    The class of a lower bound of the frustration index.
+    A cycle with exactly one negative edge can not be satisfied by any partition: the positive path puts its ends
+    into the same cluster and the negative edge asks for different ones. Hence the number of edge-disjoint such
+    cycles is a lower bound. They are packed greedily, the short ones first:
+        round d: for every negative edge (u, v) left, look for a path u -> v of at most d unused positive edges.
+    Note: cycles with an odd number of negative edges bound the two-cluster version only, three mutually negative
+    nodes are not frustrated when any number of clusters is allowed.
+    """
+
+    def __init__(self, graph: utils.SignedGraph, max_length=8):
+        """
+        class initialization, the packing is computed at once
+
+        :param graph: the graph to be bounded
+        :param max_length: max number of positive edges in a cycle
+        """
+
+        self.max_length = max_length
+        # the unused positive edges
+        self.__positive = [set(graph.positive_neighbors(node)) for node in range(graph.vnum)]
+        self.cycles = []
+
+        negative = [(u, v) for u, v, attr in graph.edges() if attr == -1]
+        # a positive edge and a negative edge never join the same pair of nodes, the shortest cycle is a triangle
+        for length in range(2, max_length + 1):
+            left = []
+            for u, v in negative:
+                path = self.__short_path(u, v, length)
+                if path is None:
+                    left.append((u, v))
+                    continue
+                for a, b in zip(path, path[1:]):
+                    self.__positive[a].discard(b)
+                    self.__positive[b].discard(a)
+                self.cycles.append(path)
+            negative = left
+
+    @property
+    def value(self):
+        # number of edge-disjoint cycles with one negative edge
+        return len(self.cycles)
+
+    def __short_path(self, u, v, length):
+        """
+        a path u -> v of at most length unused positive edges, breadth first from both ends,
+        the smaller frontier is expanded each time
+
+        :return: a list of nodes from u to v, None if not found
+        """
+
+        positive = self.__positive
+        if length == 2:
+            common = positive[u] & positive[v]
+            return [u, next(iter(common)), v] if common else None
+
+        # parents on the side of u and on the side of v
+        parents = ({u: None}, {v: None})
+        frontiers = ([u], [v])
+        depth = 0
+        while depth < length and frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            parent, other = parents[side], parents[1 - side]
+            next_frontier = []
+            for node in frontiers[side]:
+                for nbr in positive[node]:
+                    if nbr in parent:
+                        continue
+                    parent[nbr] = node
+                    if nbr in other:
+                        return self.__join(parents, nbr)
+                    next_frontier.append(nbr)
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            depth += 1
+        return None
+
+    @staticmethod
+    def __join(parents, middle):
+        # the path from u to the middle node and on to v
+        path = []
+        node = middle
+        while node is not None:
+            path.append(node)
+            node = parents[0][node]
+        path.reverse()
+        node = parents[1][middle]
+        while node is not None:
+            path.append(node)
+            node = parents[1][node]
+        return path
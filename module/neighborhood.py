@@ -6,7 +6,7 @@ import signed_utils as utils
 class Neighborhood:
     """
     The class of the neighborhood structure.
-    The positive and negative neighborhoods of each node are stored here.
+    The positive and negative neighborhoods of each node are stored here, in the CSR arrays of a SignedGraph.
     Also, the adjacent cluster can be got when a partition is specified using this class.
     """
 
@@ -17,7 +17,8 @@ class Neighborhood:
         :param dataset: a reference to a Dataset instance
         """
         self._dataset = dataset
-        self.neighborhood_structure = self.__collect_neighbor_info()
+        # shared with the dataset, the graph is replaced rather than modified when nodes are removed
+        self.graph = dataset.graph
 
     def get_adjacent_cluster(self, node, solution) -> set:
         """
@@ -27,8 +28,8 @@ class Neighborhood:
         :param solution: a solution vector
         :return: the adjacent clusters
         """
-        nbr = self.neighborhood_structure[node]['+'] | self.neighborhood_structure[node]['-']
-        nbr_community = set([solution[i] for i in nbr])
+        g = self.graph
+        nbr_community = {solution[i] for i in g.neighbors(node)}
         # when the element doesn't exist, discard would not raise KeyError
         nbr_community.discard(solution[node])
 
@@ -44,76 +45,24 @@ class Neighborhood:
         :return: the adjacent clusters
         """
 
-        adjacent_node = set()
-        # TODO the algorithm about adjacent community needs to be optimized
-        # the algorithm to find neighbor clusters is inefficient
+        g = self.graph
+        adjacent_community = set()
+        # O(sum of degrees) in the cluster, the objective functions which maintain a quotient graph
+        # (see Frustration.cluster_links) answer the adjacency of clusters without this scan
 
         for node in partition[cid]:
-            adjacent_node = adjacent_node | self.neighborhood_structure[node]['+'] | self.neighborhood_structure[node]['-']
+            adjacent_community.update([solution[i] for i in g.neighbors(node)])
 
-        adjacent_community = set([solution[i] for i in adjacent_node])
         adjacent_community.discard(cid)
 
         return adjacent_community
 
-    def __collect_neighbor_info(self) -> dict:
+    def remove_nodes(self, nodes):
         """
-        construct the neighborhood structure
+        remove all the edges incident to the given nodes from the neighborhood structure
+        Note: the dataset is not changed
 
-        :return: a dictionary, {node_id: all neighborhoods (see self.__get_neighbors(node))}
+        :param nodes: a collection of node ids
+        :return: None
         """
-        neighbors = dict()
-        for i in range(self._dataset.vnum):
-            neighbor = self.__get_neighbors(i)
-            if not neighbor['+'] and not neighbor['-']:
-                continue
-            else:
-                neighbors[i] = neighbor
-
-        return neighbors
-
-    def __get_neighbors(self, node) -> dict:
-        """
-        find all the positive and negative neighborhoods of a node
-
-        :param node: the number of node
-        :return: a dictionary, {"+": set() of positive neighborhoods, "-": set() of negative neighborhoods}
-        """
-
-        # prejudgment
-        nbr = self._dataset.data[node].keys()
-        nbr_values = self._dataset.data[node].values()
-        neg_num = (len(nbr_values) - sum(nbr_values)) / 2
-        pos_num = len(nbr_values) - neg_num
-
-        # find neighborhoods
-        neg_nbr, pos_nbr = set(), set()
-        if pos_num > neg_num:
-            # negative first
-            for nid, attr in self._dataset.data[node].items():
-                if neg_num == 0:
-                    break
-                if attr == -1:
-                    neg_nbr.add(nid)
-                    neg_num -= 1
-            pos_nbr = set(nbr) - set(neg_nbr)
-            nbr_structure = {
-                '+': pos_nbr,
-                '-': neg_nbr
-            }
-
-        else:
-            # positive
-            for nid, attr in self._dataset.data[node].items():
-                if pos_num == 0:
-                    break
-                if attr == 1:
-                    pos_nbr.add(nid)
-                    pos_num -= 1
-            neg_nbr = set(nbr) - set(pos_nbr)
-            nbr_structure = {
-                '+': pos_nbr,
-                '-': neg_nbr
-            }
-
-        return nbr_structure
+        self.graph = self.graph.without_nodes(nodes)
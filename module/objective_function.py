@@ -1,5 +1,6 @@
 import signed_utils as utils
 import abc
+from module.cluster_allocator import ClusterIdAllocator
 
 
 class ObjectiveFunction:
@@ -9,33 +10,97 @@ class ObjectiveFunction:
     The specific objective function should inherit this class and implement the abstract methods.
     """
 
-    def __init__(self, dataset: utils.Dataset, init_solution=None):
+    def __init__(self, dataset: utils.Dataset, init_solution=None, graph: utils.SignedGraph = None):
         """
         class initialization
 
         :param dataset: a reference to a Dataset instance
         :param init_solution: optional, the initial solution vector
+        :param graph: optional, the graph explored by the moves, default: the graph of the dataset
         """
 
         self._dataset = dataset
+        self._graph = dataset.graph if graph is None else graph
         self.obj_value = dataset.enum
+        # operations recorded since the last checkpoint, None if not recording
+        self._journal = None
+        self._checkpoint_value = None
+        # nodes whose cluster changed since the last local search, None if all the nodes should be revisited
+        self.touched = None
 
         if init_solution is None:
-            self.solution, self.partition = utils.default_initialization(self._dataset.vnum)
+            self.partition = utils.Partition.singletons(self._dataset.vnum)
         else:
-            self.solution = init_solution
-            self.partition = utils.solution2partition(init_solution)
+            self.partition = utils.Partition.from_solution(init_solution)
+        self.cluster_ids = ClusterIdAllocator(self.partition.keys())
         self.update_objective_function()
 
     def set_solution(self, solution):
         """
         set the solution vector and partition
 
-        :param solution: the solution vector
+        :param solution: the solution vector, it is copied
         :return: None
         """
-        self.solution = solution
-        self.partition = utils.solution2partition(solution)
+        self.partition = utils.Partition.from_solution(solution)
+        self.cluster_ids = ClusterIdAllocator(self.partition.keys())
+        self._journal = None
+        self.touched = None
+
+    @property
+    def solution(self):
+        # the solution vector is a view of the partition, changed only through move(), merge() and decompose()
+        return self.partition.label
+
+    def compact_clusters(self):
+        """
+        renumber the clusters into the dense range [0, number of clusters), the order of the ids is kept
+        Note: expected between iterations, the recorded operations are dropped, O(m)
+
+        :return: a dict, {previous cluster id: current cluster id}
+        """
+
+        mapping = {cid: idx for idx, cid in enumerate(sorted(self.partition.keys()))}
+        value, touched = self.obj_value, self.touched
+        self.set_solution([mapping[self.solution[i]] for i in range(self.vnum)])
+        self.obj_value, self.touched = value, touched
+        return mapping
+
+    def checkpoint(self):
+        """
+        start recording the operations (move, merge and decompose), rollback() restores the state of this moment
+
+        :return: None
+        """
+        self._journal = []
+        self._checkpoint_value = self.obj_value
+
+    def commit(self):
+        """
+        keep the current state and drop the recorded operations
+
+        :return: None
+        """
+        self._journal = None
+
+    def rollback(self):
+        """
+        undo the operations recorded since the last checkpoint in reverse order,
+        in time proportional to the number of changes instead of the size of the solution
+
+        :return: None
+        """
+
+        journal, self._journal = self._journal, None
+        for entry in reversed(journal):
+            if entry[0] == 'move':
+                # ('move', node, previous cluster), decompose() is recorded as a move as well
+                self.move(entry[1], entry[2], 0)
+            else:
+                # ('merge', removed cluster, its nodes)
+                for node in entry[2]:
+                    self.move(node, entry[1], 0)
+        self.obj_value = self._checkpoint_value
 
     def update_objective_function(self):
         """
@@ -61,6 +126,42 @@ class ObjectiveFunction:
     def delta_caused_by_move(self, node, destination, neighborhood):
         pass
 
+    def best_move(self, node, neighborhood):
+        """
+        find the adjacent cluster which improves the objective function most when the node is moved into it
+
+        :param node: number of node
+        :param neighborhood: an instance of Neighborhood
+        :return: (candidate cluster, delta), candidate is -1 if no move improves
+        """
+
+        min_delta = 0
+        candidate = -1
+        for nbr_cluster in neighborhood.get_adjacent_cluster(node, self.solution):
+            delta = self.delta_caused_by_move(node, nbr_cluster, neighborhood.graph)
+            if delta < min_delta:
+                min_delta = delta
+                candidate = nbr_cluster
+        return candidate, min_delta
+
+    def best_merge(self, cid, neighborhood):
+        """
+        find the adjacent cluster which improves the objective function most when it is merged with the cluster
+
+        :param cid: number of cluster
+        :param neighborhood: an instance of Neighborhood
+        :return: (candidate cluster, delta), candidate is -1 if no merge improves
+        """
+
+        min_delta = 0
+        candidate = -1
+        for c2 in neighborhood.get_adjacent_cluster_of_cluster(cid, self.solution, self.partition):
+            delta = self.delta_caused_by_merge(cid, c2, neighborhood.graph)
+            if delta < min_delta:
+                min_delta = delta
+                candidate = c2
+        return candidate, min_delta
+
     @abc.abstractmethod
     def merge(self, c1, c2, delta):
         pass
@@ -0,0 +1,206 @@
+import csv
+import json
+import time
+from module.objective_function import ObjectiveFunction
+
+
+class Profiler:
+    """
+    The class of the instrumentation of IG.
+    The wall time of each phase and the calls of the objective function are recorded per iteration:
+        records[i] = {'iteration': i, 'value': ..., 'candidate_value': ..., 'time': ...,
+                      'phases': {phase: {'time': seconds, 'move': calls, 'best_move': calls, ...}}}
+    Record 0 is the initialization. Nothing is wrapped or timed unless a profiler is given to IteratedGreedy,
+    the cost of a disabled profiler is a single check per iteration.
+    """
+
+    # methods of the objective function whose calls are counted
+    COUNTED = ('best_move', 'best_merge', 'delta_caused_by_move', 'delta_caused_by_merge',
+               'delta_caused_by_decompose', 'move', 'merge', 'decompose')
+
+    def __init__(self, clock=time.perf_counter):
+        """
+        class initialization
+
+        :param clock: the timer, time.perf_counter by default
+        """
+
+        self.clock = clock
+        self.records = []
+        self._record = None
+        self._phase = None
+        self._counts = None
+        self._lap = None
+        self._iteration_start = None
+        self._attached = None
+
+    def attach(self, obj_function: ObjectiveFunction):
+        """
+        count the calls of the objective function, the methods are wrapped on the instance only
+
+        :param obj_function: an instance of objective function
+        :return: None
+        """
+
+        self.detach()
+        for name in self.COUNTED:
+            setattr(obj_function, name, self.__counting(name, getattr(obj_function, name)))
+        self._attached = obj_function
+
+    def detach(self):
+        """
+        restore the methods of the attached objective function
+
+        :return: None
+        """
+
+        if self._attached is not None:
+            for name in self.COUNTED:
+                self._attached.__dict__.pop(name, None)
+            self._attached = None
+
+    def begin_iteration(self, iteration):
+        now = self.clock()
+        self._record = {'iteration': iteration, 'value': None, 'candidate_value': None, 'time': 0.0, 'phases': {}}
+        self._iteration_start = now
+        self._phase = None
+        self._counts = None
+        self._lap = now
+
+    def phase(self, name):
+        """
+        close the current phase and start timing another one
+
+        :param name: name of the phase, e.g. 'destruction'
+        :return: None
+        """
+
+        now = self.clock()
+        if self._phase is not None:
+            self._counts['time'] += now - self._lap
+        self._phase = name
+        self._counts = self._record['phases'].setdefault(name, {'time': 0.0})
+        self._lap = now
+
+    def count(self, name, n=1):
+        """
+        add to a counter of the current phase, e.g. the passes of local_move
+
+        :return: None
+        """
+
+        if self._counts is not None:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def end_iteration(self, value, candidate_value=None):
+        """
+        :param value: objective function value after the iteration
+        :param candidate_value: value of the solution before the acceptance criterion
+        :return: the record of the iteration
+        """
+
+        now = self.clock()
+        if self._phase is not None:
+            self._counts['time'] += now - self._lap
+        record = self._record
+        record['value'] = value
+        record['candidate_value'] = candidate_value
+        record['time'] = now - self._iteration_start
+        self.records.append(record)
+        self._record = self._phase = self._counts = None
+        return record
+
+    def summary(self):
+        """
+        totals over the recorded iterations, the initialization (record 0) is reported separately
+
+        :return: dict with the number of iterations, total time, and the totals and time share of each phase
+        """
+
+        iterations = [r for r in self.records if r['iteration'] > 0]
+        total_time = sum(r['time'] for r in iterations)
+        phases = {}
+        for record in iterations:
+            for name, counts in record['phases'].items():
+                totals = phases.setdefault(name, {})
+                for key, n in counts.items():
+                    totals[key] = totals.get(key, 0) + n
+        for totals in phases.values():
+            totals['share'] = totals['time'] / total_time if total_time else 0.0
+            totals['mean_time'] = totals['time'] / len(iterations)
+
+        accepted = sum(1 for r in iterations
+                       if r['candidate_value'] is not None and r['value'] == r['candidate_value'])
+        initialization = [r for r in self.records if r['iteration'] == 0]
+        return {
+            'iterations': len(iterations),
+            'time': total_time,
+            'iterations_per_second': len(iterations) / total_time if total_time else None,
+            'accepted': accepted,
+            'initialization': initialization[0]['phases'] if initialization else None,
+            'phases': phases
+        }
+
+    def report(self):
+        """
+        :return: a table of the phases as a string
+        """
+
+        summary = self.summary()
+        lines = ['%-16s %10s %7s %12s %12s %10s' % ('phase', 'time(s)', 'share', 'best_move', 'best_merge', 'moves')]
+        for name, totals in summary['phases'].items():
+            lines.append('%-16s %10.3f %6.1f%% %12d %12d %10d' %
+                         (name, totals['time'], totals['share'] * 100, totals.get('best_move', 0),
+                          totals.get('best_merge', 0), totals.get('move', 0) + totals.get('decompose', 0)))
+        lines.append('%d iterations in %.3f s, %d accepted' %
+                     (summary['iterations'], summary['time'], summary['accepted']))
+        return '\n'.join(lines)
+
+    def to_json(self, path):
+        """
+        write the summary and the records of the iterations into a JSON file
+
+        :param path: path of the file
+        :return: None
+        """
+
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'iterations': self.records}, f, indent=2)
+
+    def to_csv(self, path):
+        """
+        write a row per iteration into a CSV file, the counters of the phases are flattened as "phase.counter"
+
+        :param path: path of the file
+        :return: None
+        """
+
+        rows = []
+        columns = ['iteration', 'value', 'candidate_value', 'time']
+        for record in self.records:
+            row = {key: record[key] for key in columns}
+            for name, counts in record['phases'].items():
+                for key, n in counts.items():
+                    row[name + '.' + key] = n
+            rows.append(row)
+
+        extra = []
+        for row in rows:
+            extra.extend(key for key in row if key not in columns and key not in extra)
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns + extra, restval=0)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def __counting(self, name, method):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            counts = profiler._counts
+            if counts is not None:
+                counts[name] = counts.get(name, 0) + 1
+            return method(*args, **kwargs)
+
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        return wrapper
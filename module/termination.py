@@ -0,0 +1,155 @@
+import time
+
+
+class Termination:
+    """
+    The class of the termination condition of IG.
+    start() is called when a run begins, stop() after every iteration with the current objective function value.
+    Conditions can be combined: a | b stops when either of them is met, a & b when both are met.
+    """
+
+    def start(self):
+        """
+        reset the condition at the beginning of a run
+
+        :return: None
+        """
+        pass
+
+    def stop(self, iteration, value):
+        """
+        :param iteration: number of iterations done
+        :param value: current objective function value
+        :return: the reason for stopping, None if the run should continue
+        """
+        return None
+
+    def __or__(self, other):
+        return AnyOf(self, other)
+
+    def __and__(self, other):
+        return AllOf(self, other)
+
+
+class MaxIterations(Termination):
+    """
+    stop after a fixed number of iterations
+    """
+
+    def __init__(self, max_iter):
+        self.max_iter = max_iter
+
+    def stop(self, iteration, value):
+        return 'max_iter' if iteration >= self.max_iter else None
+
+
+class TimeBudget(Termination):
+    """
+    stop when the wall-clock budget of the run is used up
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.start_time = None
+
+    def start(self):
+        self.start_time = time.time()
+
+    def stop(self, iteration, value):
+        return 'time_budget' if time.time() - self.start_time >= self.seconds else None
+
+
+class Stagnation(Termination):
+    """
+    stop when the best value is not improved for a number of iterations and/or a number of seconds
+    """
+
+    def __init__(self, iterations=None, seconds=None):
+        """
+        :param iterations: max number of iterations without improvement, None: not limited
+        :param seconds: max time without improvement, None: not limited
+        """
+        self.iterations = iterations
+        self.seconds = seconds
+        self.best_value = None
+        self.last_iteration = 0
+        self.last_time = None
+
+    def start(self):
+        self.best_value = None
+        self.last_iteration = 0
+        self.last_time = time.time()
+
+    def stop(self, iteration, value):
+        if self.best_value is None or value < self.best_value:
+            self.best_value = value
+            self.last_iteration = iteration
+            self.last_time = time.time()
+            return None
+
+        if self.iterations is not None and iteration - self.last_iteration >= self.iterations:
+            return 'stagnation'
+        if self.seconds is not None and time.time() - self.last_time >= self.seconds:
+            return 'stagnation'
+        return None
+
+
+class TargetValue(Termination):
+    """
+    stop when the objective function value reaches a target, e.g. the best known value of a dataset
+    """
+
+    def __init__(self, target):
+        self.target = target
+
+    def stop(self, iteration, value):
+        return 'target' if value <= self.target else None
+
+
+class ProvenOptimal(TargetValue):
+    """
+    stop when the objective function value reaches a lower bound, the solution is optimal then
+    """
+
+    def stop(self, iteration, value):
+        return 'optimal' if value <= self.target else None
+
+
+class AnyOf(Termination):
+    """
+    stop when any of the conditions is met
+    """
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def start(self):
+        for condition in self.conditions:
+            condition.start()
+
+    def stop(self, iteration, value):
+        # every condition is updated, e.g. Stagnation tracks the best value
+        reasons = [condition.stop(iteration, value) for condition in self.conditions]
+        for reason in reasons:
+            if reason is not None:
+                return reason
+        return None
+
+
+class AllOf(Termination):
+    """
+    stop when all of the conditions are met
+    """
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def start(self):
+        for condition in self.conditions:
+            condition.start()
+
+    def stop(self, iteration, value):
+        reasons = [condition.stop(iteration, value) for condition in self.conditions]
+        if all(reason is not None for reason in reasons):
+            return '+'.join(reasons)
+        return None
@@ -0,0 +1,233 @@
+import signed_utils as utils
+
+np = utils.np
+
+
+class FrustrationEvaluator:
+    """
+    The class of the vectorized evaluation of the frustration index.
+    The graph is flattened into edge arrays (n1, n2, sign), each undirected edge once, and a solution vector
+    is scored with a few array operations. NumPy is used when it is available, otherwise the edge arrays are
+    scanned in pure Python.
+    """
+
+    def __init__(self, graph: utils.SignedGraph, chunk_size=64):
+        """
+        class initialization
+
+        :param graph: the graph to be evaluated
+        :param chunk_size: number of solutions scored together in evaluate_batch(), bounds the temporary memory
+        """
+
+        self.vnum = graph.vnum
+        self.chunk_size = chunk_size
+
+        if np is not None and graph.edge_list is not None:
+            # zero copy views of the edge arrays kept by the graph, e.g. those of a mapped cache file
+            self.us, self.vs, self.signs = (np.asarray(a) for a in graph.edge_list)
+            self.positive = self.signs > 0
+        elif np is not None:
+            # built from the CSR arrays directly, the edge n1 -> n2 is kept only if n1 < n2
+            offset = np.array(graph.offset, dtype=np.int64)
+            us = np.repeat(np.arange(graph.vnum, dtype=np.int64), np.diff(offset))
+            vs = np.array(graph.neighbor, dtype=np.int64)
+            signs = np.array(graph.sign, dtype=np.int8)
+            mask = us < vs
+            self.us, self.vs, self.signs = us[mask], vs[mask], signs[mask]
+            self.positive = self.signs > 0
+        else:
+            self.us, self.vs, self.signs = graph.edge_arrays()
+            self.positive = None
+
+    def evaluate(self, solution) -> int:
+        """
+        calculate the frustration index of a solution vector, O(m) array operations
+
+        :param solution: a solution vector, list, dict or numpy.ndarray
+        :return: frustration index
+        """
+
+        if np is None:
+            frustration = 0
+            for n1, n2, attr in zip(self.us, self.vs, self.signs):
+                # positive edges between clusters or negative edges within clusters
+                if (solution[n1] == solution[n2]) != (attr == 1):
+                    frustration += 1
+            return frustration
+
+        sl = self.__as_array(solution)
+        same = sl[self.us] == sl[self.vs]
+        return int(np.count_nonzero(same != self.positive))
+
+    def evaluate_batch(self, solutions) -> list:
+        """
+        calculate the frustration indices of many solution vectors of the same graph in a single call
+
+        :param solutions: a sequence of solution vectors, or a 2-d numpy.ndarray with a solution in each row
+        :return: a list of frustration indices
+        """
+
+        if np is None:
+            return [self.evaluate(solution) for solution in solutions]
+
+        if isinstance(solutions, np.ndarray):
+            matrix = solutions
+        else:
+            matrix = np.stack([self.__as_array(solution) for solution in solutions]) if len(solutions) \
+                else np.empty((0, self.vnum), dtype=np.int64)
+
+        values = []
+        for start in range(0, matrix.shape[0], self.chunk_size):
+            chunk = matrix[start:start + self.chunk_size]
+            same = chunk[:, self.us] == chunk[:, self.vs]
+            values.extend(np.count_nonzero(same != self.positive, axis=1).tolist())
+        return values
+
+    def cluster_frustration(self, solution) -> dict:
+        """
+        the breakdown of the frustration index by clusters
+
+        :param solution: a solution vector, list, dict or numpy.ndarray
+        :return: dict(cluster_id: (negative edges within the cluster, positive edges leaving the cluster)),
+                 frustration index = sum of the former + sum of the latter / 2
+        """
+
+        breakdown = dict()
+
+        if np is None:
+            for n1, n2, attr in zip(self.us, self.vs, self.signs):
+                c1, c2 = solution[n1], solution[n2]
+                if c1 == c2 and attr == -1:
+                    neg_in, pos_out = breakdown.get(c1, (0, 0))
+                    breakdown[c1] = (neg_in + 1, pos_out)
+                elif c1 != c2 and attr == 1:
+                    for cid in (c1, c2):
+                        neg_in, pos_out = breakdown.get(cid, (0, 0))
+                        breakdown[cid] = (neg_in, pos_out + 1)
+            return breakdown
+
+        sl = self.__as_array(solution)
+        cu, cv = sl[self.us], sl[self.vs]
+        same = cu == cv
+        neg_in_mask = same & ~self.positive
+        pos_out_mask = ~same & self.positive
+
+        # cluster ids are compacted before counting, they are not necessarily dense
+        cids, inverse = np.unique(np.concatenate((cu, cv)), return_inverse=True)
+        m = len(cu)
+        neg_in = np.bincount(inverse[:m][neg_in_mask], minlength=len(cids))
+        pos_out = np.bincount(inverse[:m][pos_out_mask], minlength=len(cids)) + \
+            np.bincount(inverse[m:][pos_out_mask], minlength=len(cids))
+
+        for cid, n, p in zip(cids.tolist(), neg_in.tolist(), pos_out.tolist()):
+            if n or p:
+                breakdown[cid] = (n, p)
+        return breakdown
+
+    def __as_array(self, solution):
+        if isinstance(solution, np.ndarray):
+            return solution
+        if isinstance(solution, dict):
+            return np.fromiter((solution[i] for i in range(self.vnum)), dtype=np.int64, count=self.vnum)
+        return np.asarray(solution, dtype=np.int64)
+
+
+class BatchMoveEvaluator:
+    """
+    The class of the batched evaluation of node moves, numpy is required.
+    The signed adjacency (CSR) is multiplied by the membership matrix of the partition for a batch of nodes,
+    W[b, c] = positive edges - negative edges between node b and cluster c, so the delta of moving b into c is
+    W[b, current cluster] - W[b, c] and the best target of each node is the row-wise argmin.
+    The product is computed as a group-by on (row, cluster of the neighbor), the membership matrix is never built.
+    """
+
+    def __init__(self, graph: utils.SignedGraph):
+        """
+        class initialization
+
+        :param graph: the graph explored by the moves
+        """
+
+        self.vnum = graph.vnum
+        self.offset = np.asarray(graph.offset, dtype=np.int64)
+        self.neighbor = np.asarray(graph.neighbor, dtype=np.int64)
+        self.weight = np.asarray(graph.sign, dtype=np.int64)
+
+    def best_moves(self, nodes, solution):
+        """
+        the best move of every node of the batch against the same partition
+
+        :param nodes: a sequence of nodes
+        :param solution: the solution vector
+        :return: (candidates, deltas), numpy arrays aligned with nodes, candidate is -1 if no move improves
+        """
+
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if isinstance(solution, dict):
+            sl = np.fromiter((solution[i] for i in range(self.vnum)), dtype=np.int64, count=self.vnum)
+        else:
+            sl = np.asarray(solution, dtype=np.int64)
+        b = len(nodes)
+        candidates = np.full(b, -1, dtype=np.int64)
+        deltas = np.zeros(b, dtype=np.int64)
+
+        starts, ends = self.offset[nodes], self.offset[nodes + 1]
+        lens = ends - starts
+        total = int(lens.sum())
+        if not total:
+            return candidates, deltas
+
+        # the neighbor entries of the batch, row by row
+        rows = np.repeat(np.arange(b, dtype=np.int64), lens)
+        idx = np.arange(total, dtype=np.int64) + np.repeat(starts - (np.cumsum(lens) - lens), lens)
+        clusters = sl[self.neighbor[idx]]
+
+        # W = A[nodes] @ M, summed over the entries of the same (row, cluster)
+        width = int(sl.max()) + 1
+        keys, inverse = np.unique(rows * width + clusters, return_inverse=True)
+        w = np.bincount(inverse.ravel(), weights=self.weight[idx], minlength=len(keys)).astype(np.int64)
+        urow, ucluster = keys // width, keys % width
+
+        own = ucluster == sl[nodes][urow]
+        base = np.zeros(b, dtype=np.int64)
+        base[urow[own]] = w[own]
+        delta = base[urow] - w
+        # every adjacent cluster is a candidate except the current one, even with a zero weight
+        delta[own] = 0
+
+        # the smallest delta of each row, keys are sorted by row already
+        order = np.lexsort((delta, urow))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = urow[order][1:] != urow[order][:-1]
+        pick = order[first]
+        improving = delta[pick] < 0
+        pick = pick[improving]
+        candidates[urow[pick]] = ucluster[pick]
+        deltas[urow[pick]] = delta[pick]
+        return candidates, deltas
+
+    def apply(self, obj_function, nodes, neighborhood=None):
+        """
+        evaluate the batch at once and move the nodes in order.
+        A node is re-evaluated exactly by obj_function.best_move() if one of its neighbors has been moved before it,
+        otherwise the batched proposal is still exact, so the objective function value is tracked exactly.
+
+        :param obj_function: an instance of objective function, e.g. Frustration
+        :param nodes: a sequence of nodes
+        :param neighborhood: passed to best_move() of the conflicts
+        :return: number of moves applied
+        """
+
+        candidates, deltas = self.best_moves(nodes, obj_function.solution)
+        dirty = np.zeros(self.vnum, dtype=bool)
+        offset, neighbor = self.offset, self.neighbor
+        moves = 0
+
+        for node, candidate, delta in zip(nodes, candidates.tolist(), deltas.tolist()):
+            if dirty[node]:
+                candidate, delta = obj_function.best_move(node, neighborhood)
+            if candidate != -1:
+                obj_function.move(node, candidate, delta)
+                dirty[neighbor[offset[node]:offset[node + 1]]] = True
+                moves += 1
+        return moves
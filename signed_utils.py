@@ -1,8 +1,22 @@
 # encoding: utf-8
 
 
+import array
 import collections
-# import numpy as np
+import concurrent.futures
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+import sys
+import uuid
+import warnings
+# numpy is optional, the vectorized paths are used only when it is available
+try:
+    import numpy as np
+except ImportError:
+    np = None
 # import networkx
 # import matplotlib.pyplot
 
@@ -17,57 +31,1195 @@ Data structures and some common methods are defined here.
 """
 
 
+class SignedGraph:
+    """
+    compact CSR (compressed sparse row) storage of an undirected signed graph, O(n+m) machine ints
+
+    vnum: num of vertices, int
+    offset: the adjacency of node i is neighbor[offset[i]:offset[i + 1]], array of n + 1 ints
+    split: the positive neighbors of node i come first, neighbor[offset[i]:split[i]],
+           then the negative ones, neighbor[split[i]:offset[i + 1]], array of n ints
+    neighbor: ids of the adjacent nodes, array of 2m ints
+    sign: the sign (1 or -1) of the edge stored at the same position of neighbor, array of 2m bytes
+    edge_list: optional, (n1, n2, sign) arrays with each undirected edge once, kept when loaded from a cache file
+    Note: the arrays are memoryviews of a mapped file when the graph is loaded by load_binary()
+    """
+
+    def __init__(self, vnum: int, offset: array.array, split: array.array, neighbor: array.array, sign: array.array,
+                 edge_list=None):
+        self.vnum = vnum
+        self.offset = offset
+        self.split = split
+        self.neighbor = neighbor
+        self.sign = sign
+        self.edge_list = edge_list
+
+    def __getstate__(self):
+        # memoryviews of a mapped file can not be pickled, they are copied into arrays
+        state = self.__dict__.copy()
+        for key in ('offset', 'split', 'neighbor', 'sign'):
+            if isinstance(state[key], memoryview):
+                state[key] = array.array(state[key].format, state[key].tobytes())
+        if state['edge_list'] is not None:
+            state['edge_list'] = tuple(array.array(a.format, a.tobytes()) if isinstance(a, memoryview) else a
+                                       for a in state['edge_list'])
+        return state
+
+    @classmethod
+    def from_edges(cls, vnum: int, us, vs, signs) -> 'SignedGraph':
+        """
+        build the graph from parallel edge sequences, each undirected edge is expected only once
+
+        :param vnum: number of vertices, enlarged automatically if a node id is out of range
+        :param us: one end of each edge, a sequence of ints
+        :param vs: the other end of each edge, a sequence of ints
+        :param signs: sign of each edge, edges with a sign other than 1 or -1 are ignored
+        :return: an instance of class SignedGraph
+        """
+
+        if np is not None:
+            return cls.__from_edge_arrays(vnum, us, vs, signs)
+
+        if us:
+            vnum = max(vnum, max(us) + 1, max(vs) + 1)
+        pos_degree, neg_degree = [0] * vnum, [0] * vnum
+        for u, v, s in zip(us, vs, signs):
+            # self loops are dropped, they can not be balanced by any partition
+            if u == v:
+                continue
+            if s == 1:
+                pos_degree[u] += 1
+                pos_degree[v] += 1
+            elif s == -1:
+                neg_degree[u] += 1
+                neg_degree[v] += 1
+
+        offset = array.array('q', bytes(8 * (vnum + 1)))
+        split = array.array('q', bytes(8 * vnum))
+        total = 0
+        for i in range(vnum):
+            offset[i] = total
+            split[i] = total + pos_degree[i]
+            total += pos_degree[i] + neg_degree[i]
+        offset[vnum] = total
+
+        neighbor = array.array('i', bytes(4 * total))
+        sign = array.array('b', bytes(total))
+        # next free position of the positive and negative slices of each node
+        pos_fill, neg_fill = list(offset[:vnum]), list(split)
+        for u, v, s in zip(us, vs, signs):
+            if u == v:
+                continue
+            if s == 1:
+                fill = pos_fill
+            elif s == -1:
+                fill = neg_fill
+            else:
+                continue
+            neighbor[fill[u]], sign[fill[u]] = v, s
+            neighbor[fill[v]], sign[fill[v]] = u, s
+            fill[u] += 1
+            fill[v] += 1
+
+        return cls(vnum, offset, split, neighbor, sign)
+
+    @classmethod
+    def __from_edge_arrays(cls, vnum: int, us, vs, signs) -> 'SignedGraph':
+        """
+        vectorized version of from_edges(), the layout of the arrays is the same
+        """
+
+        us, vs = np.asarray(us, dtype=np.int64), np.asarray(vs, dtype=np.int64)
+        signs = np.asarray(signs, dtype=np.int8)
+        if len(us):
+            vnum = max(vnum, int(us.max()) + 1, int(vs.max()) + 1)
+        keep = (us != vs) & ((signs == 1) | (signs == -1))
+        us, vs, signs = us[keep], vs[keep], signs[keep]
+
+        # both directions of each edge, in the order of the edges
+        src = np.stack((us, vs), axis=1).ravel()
+        dst = np.stack((vs, us), axis=1).ravel()
+        sgn = np.repeat(signs, 2)
+        # grouped by node, positive neighbors first, the order of the edges is kept within the groups
+        order = np.argsort(src * 2 + (sgn < 0), kind='stable')
+
+        offset = np.zeros(vnum + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=vnum), out=offset[1:])
+        split = offset[:-1] + np.bincount(src[sgn > 0], minlength=vnum)
+
+        return cls(vnum, array.array('q', offset.tobytes()), array.array('q', split.tobytes()),
+                   array.array('i', dst[order].astype(np.int32).tobytes()),
+                   array.array('b', sgn[order].tobytes()))
+
+    @classmethod
+    def from_dict(cls, vnum: int, data: dict) -> 'SignedGraph':
+        """
+        build the graph from a symmetric adjacency dict, dict(node: dict(nbr: attr))
+
+        :param vnum: number of vertices
+        :param data: a graph stored by adjacency table using hash
+        :return: an instance of class SignedGraph
+        """
+
+        us, vs, signs = array.array('i'), array.array('i'), array.array('b')
+        for node, nbrs in data.items():
+            for nbr, attr in nbrs.items():
+                if node < nbr and (attr == 1 or attr == -1):
+                    us.append(node)
+                    vs.append(nbr)
+                    signs.append(attr)
+        return cls.from_edges(vnum, us, vs, signs)
+
+    @property
+    def enum(self):
+        # each undirected edge is stored twice
+        return len(self.neighbor) // 2
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.offset, self.split, self.neighbor, self.sign))
+
+    def degree(self, node):
+        return self.offset[node + 1] - self.offset[node]
+
+    def positive_degree(self, node):
+        return self.split[node] - self.offset[node]
+
+    def negative_degree(self, node):
+        return self.offset[node + 1] - self.split[node]
+
+    def neighbors(self, node) -> array.array:
+        return self.neighbor[self.offset[node]:self.offset[node + 1]]
+
+    def positive_neighbors(self, node) -> array.array:
+        return self.neighbor[self.offset[node]:self.split[node]]
+
+    def negative_neighbors(self, node) -> array.array:
+        return self.neighbor[self.split[node]:self.offset[node + 1]]
+
+    def signed_neighbors(self, node):
+        """
+        :param node: number of node
+        :return: an iterator of (nbr, sign)
+        """
+        lo, hi = self.offset[node], self.offset[node + 1]
+        return zip(self.neighbor[lo:hi], self.sign[lo:hi])
+
+    def edge_arrays(self):
+        """
+        :return: parallel arrays (n1, n2, sign) with n1 < n2, each undirected edge once
+        """
+        if self.edge_list is not None:
+            return self.edge_list
+        us, vs, signs = array.array('i'), array.array('i'), array.array('b')
+        for n1, n2, attr in self.edges():
+            us.append(n1)
+            vs.append(n2)
+            signs.append(attr)
+        return us, vs, signs
+
+    def edges(self):
+        """
+        :return: a generator of (n1, n2, sign) with n1 < n2, each undirected edge once
+        """
+        for node in range(self.vnum):
+            for nbr, attr in self.signed_neighbors(node):
+                if node < nbr:
+                    yield node, nbr, attr
+
+    def without_nodes(self, nodes) -> 'SignedGraph':
+        """
+        a copy of the graph in which all the edges incident to the given nodes are removed
+
+        :param nodes: a collection of node ids
+        :return: a new instance of class SignedGraph, node ids are kept
+        """
+
+        nodes = set(nodes)
+        us, vs, signs = array.array('i'), array.array('i'), array.array('b')
+        for n1, n2, attr in self.edges():
+            if n1 not in nodes and n2 not in nodes:
+                us.append(n1)
+                vs.append(n2)
+                signs.append(attr)
+        return SignedGraph.from_edges(self.vnum, us, vs, signs)
+
+    def subgraph(self, nodes) -> 'SignedGraph':
+        """
+        the induced subgraph of the given nodes, renumbered by their order
+
+        :param nodes: a sequence of distinct node ids, node nodes[i] becomes node i
+        :return: a new instance of class SignedGraph with len(nodes) vertices
+        """
+
+        index = {node: i for i, node in enumerate(nodes)}
+        us, vs, signs = array.array('i'), array.array('i'), array.array('b')
+        for node in nodes:
+            i = index[node]
+            for nbr, attr in self.signed_neighbors(node):
+                j = index.get(nbr)
+                if j is not None and i < j:
+                    us.append(i)
+                    vs.append(j)
+                    signs.append(attr)
+        return SignedGraph.from_edges(len(nodes), us, vs, signs)
+
+    def components(self, positive_only=False) -> list:
+        """
+        connected components by breadth first search, O(n + m)
+
+        :param positive_only: only follow the positive edges
+        :return: a list of node lists, the nodes of each component in ascending order, isolated nodes included
+        """
+
+        label = [-1] * self.vnum
+        offset, split, neighbor = self.offset, self.split, self.neighbor
+        components = []
+
+        for root in range(self.vnum):
+            if label[root] != -1:
+                continue
+            label[root] = len(components)
+            component = [root]
+            # the list grows while it is scanned
+            for node in component:
+                for nbr in neighbor[offset[node]:split[node] if positive_only else offset[node + 1]]:
+                    if label[nbr] == -1:
+                        label[nbr] = label[root]
+                        component.append(nbr)
+            component.sort()
+            components.append(component)
+        return components
+
+    def to_dict(self) -> dict:
+        """
+        :return: the graph as a two-dimensional default dict
+        """
+        data = collections.defaultdict(lambda: collections.defaultdict(lambda: 0))
+        for node in range(self.vnum):
+            for nbr, attr in self.signed_neighbors(node):
+                data[node][nbr] = attr
+        return data
+
+
+class DynamicSignedGraph:
+    """
+    mutable storage of an undirected signed graph, a set of positive and a set of negative neighbors per node
+    It is read like a SignedGraph (degree(), neighbors(), positive_neighbors(), ...), edges are inserted, removed
+    and flipped in O(1). to_graph() packs it into a SignedGraph again.
+    Note: there are no CSR arrays here, the readers go through the methods
+    """
+
+    def __init__(self, vnum: int):
+        self.vnum = vnum
+        self.positive = [set() for _ in range(vnum)]
+        self.negative = [set() for _ in range(vnum)]
+        self.enum = 0
+
+    @classmethod
+    def from_graph(cls, graph: SignedGraph) -> 'DynamicSignedGraph':
+        """
+        :param graph: an instance of class SignedGraph, it is copied
+        :return: a new instance of class DynamicSignedGraph
+        """
+        dynamic = cls(graph.vnum)
+        for node in range(graph.vnum):
+            dynamic.positive[node].update(graph.positive_neighbors(node))
+            dynamic.negative[node].update(graph.negative_neighbors(node))
+        dynamic.enum = graph.enum
+        return dynamic
+
+    def sign_of(self, n1, n2) -> int:
+        """
+        :return: the sign of the edge between n1 and n2, 0 if they are not adjacent
+        """
+        if n2 in self.positive[n1]:
+            return 1
+        if n2 in self.negative[n1]:
+            return -1
+        return 0
+
+    def insert_edge(self, n1, n2, attr):
+        """
+        insert an edge, O(1)
+
+        :param n1: number of node
+        :param n2: number of node
+        :param attr: sign of the edge, 1 or -1
+        :return: None
+        """
+        if not (0 <= n1 < self.vnum and 0 <= n2 < self.vnum) or n1 == n2:
+            raise ValueError('invalid edge (%s, %s)' % (n1, n2))
+        if attr != 1 and attr != -1:
+            raise ValueError('invalid sign %s of edge (%s, %s)' % (attr, n1, n2))
+        if self.sign_of(n1, n2):
+            raise ValueError('edge (%s, %s) already exists' % (n1, n2))
+        side = self.positive if attr == 1 else self.negative
+        side[n1].add(n2)
+        side[n2].add(n1)
+        self.enum += 1
+
+    def remove_edge(self, n1, n2) -> int:
+        """
+        remove an edge, O(1)
+
+        :return: the sign of the removed edge
+        """
+        attr = self.sign_of(n1, n2) if 0 <= n1 < self.vnum and 0 <= n2 < self.vnum else 0
+        if not attr:
+            raise ValueError('edge (%s, %s) does not exist' % (n1, n2))
+        side = self.positive if attr == 1 else self.negative
+        side[n1].discard(n2)
+        side[n2].discard(n1)
+        self.enum -= 1
+        return attr
+
+    def flip_edge(self, n1, n2) -> int:
+        """
+        reverse the sign of an edge, O(1)
+
+        :return: the new sign of the edge
+        """
+        attr = -self.remove_edge(n1, n2)
+        self.insert_edge(n1, n2, attr)
+        return attr
+
+    def degree(self, node):
+        return len(self.positive[node]) + len(self.negative[node])
+
+    def positive_degree(self, node):
+        return len(self.positive[node])
+
+    def negative_degree(self, node):
+        return len(self.negative[node])
+
+    def neighbors(self, node):
+        return itertools.chain(self.positive[node], self.negative[node])
+
+    def positive_neighbors(self, node) -> set:
+        # the set itself, not to be changed by the reader
+        return self.positive[node]
+
+    def negative_neighbors(self, node) -> set:
+        return self.negative[node]
+
+    def signed_neighbors(self, node):
+        """
+        :param node: number of node
+        :return: an iterator of (nbr, sign)
+        """
+        return itertools.chain(((nbr, 1) for nbr in self.positive[node]), ((nbr, -1) for nbr in self.negative[node]))
+
+    def edges(self):
+        """
+        :return: a generator of (n1, n2, sign) with n1 < n2, each undirected edge once
+        """
+        for node in range(self.vnum):
+            for nbr, attr in self.signed_neighbors(node):
+                if node < nbr:
+                    yield node, nbr, attr
+
+    def edge_arrays(self):
+        """
+        :return: parallel arrays (n1, n2, sign) with n1 < n2, each undirected edge once
+        """
+        us, vs, signs = array.array('i'), array.array('i'), array.array('b')
+        for n1, n2, attr in self.edges():
+            us.append(n1)
+            vs.append(n2)
+            signs.append(attr)
+        return us, vs, signs
+
+    def to_graph(self) -> SignedGraph:
+        """
+        :return: the current graph as a new instance of class SignedGraph, O(n + m)
+        """
+        return SignedGraph.from_edges(self.vnum, *self.edge_arrays())
+
+    def to_dict(self) -> dict:
+        """
+        :return: the graph as a two-dimensional default dict
+        """
+        data = collections.defaultdict(lambda: collections.defaultdict(lambda: 0))
+        for node in range(self.vnum):
+            for nbr, attr in self.signed_neighbors(node):
+                data[node][nbr] = attr
+        return data
+
+
 class Dataset:
     """
     data structure for a given dataset
 
     vnum：num of vertices, int
     enum：num of edges, int
-    dataset: a graph stored by adjacency table using hash, dict(dict())
+    graph: the graph stored in CSR form, SignedGraph, or a DynamicSignedGraph when it is changed in place
+    data: a dict(dict()) view of the graph, built on access, kept for compatibility
     """
     def __init__(self):
         self.vnum = 0
         self.enum = 0
-        self.data = None
+        self.graph = None
+
+    @property
+    def data(self):
+        if self.graph is None:
+            return None
+        return self.graph.to_dict()
+
+    @data.setter
+    def data(self, data):
+        # vnum is expected to be set before the adjacency dict
+        self.graph = None if data is None else SignedGraph.from_dict(self.vnum, data)
+
+
+class ClusterView:
+    """
+    a read-only view of the nodes of a cluster, returned by Partition[cid]
+    """
+
+    __slots__ = ('_partition', '_cid')
+
+    def __init__(self, partition: 'Partition', cid: int):
+        self._partition = partition
+        self._cid = cid
+
+    def __iter__(self):
+        return self._partition.members(self._cid)
+
+    def __len__(self):
+        return self._partition.size[self._cid]
+
+    def __contains__(self, node):
+        return self._partition.label[node] == self._cid
+
+    def __repr__(self):
+        return repr(set(self))
+
+
+class Partition:
+    """
+    data structure for a partition of the nodes, stored in flat int arrays
+
+    label: the cluster id of each node, array('i'), also used as the solution vector
+    size: number of nodes of each cluster id, array('i'), 0 for unused ids
+    head: first node of each cluster, -1 if empty, the nodes of a cluster are chained by next and prev
+    A partition behaves like a read-only dict(cluster_id: nodes) of the non-empty clusters,
+    partition[cid] is a ClusterView. move() is O(1), merge() is O(size of the removed cluster).
+    """
+
+    def __init__(self, label: array.array):
+        """
+        class initialization
+
+        :param label: the cluster id of each node, array('i'), kept by the partition
+        """
+
+        vnum = len(label)
+        capacity = max(label) + 1 if vnum else 0
+        self.label = label
+        self.size = array.array('i', bytes(4 * capacity))
+        self.head = array.array('i', [-1]) * capacity
+        self.next = array.array('i', [-1]) * vnum
+        self.prev = array.array('i', [-1]) * vnum
+        self.count = 0
+
+        size, head, nxt, prev = self.size, self.head, self.next, self.prev
+        for node in range(vnum - 1, -1, -1):
+            cid = label[node]
+            first = head[cid]
+            if first == -1:
+                self.count += 1
+            else:
+                prev[first] = node
+            nxt[node] = first
+            head[cid] = node
+            size[cid] += 1
+
+    @classmethod
+    def from_solution(cls, solution) -> 'Partition':
+        """
+        :param solution: a solution vector, list, dict(node: cluster_id), array or numpy.ndarray, it is copied
+        :return: an instance of class Partition
+        """
+
+        if isinstance(solution, dict):
+            return cls(array.array('i', [solution[i] for i in range(len(solution))]))
+        if np is not None and isinstance(solution, np.ndarray):
+            return cls(array.array('i', solution.astype(np.int32).tobytes()))
+        return cls(array.array('i', solution))
+
+    @classmethod
+    def singletons(cls, vnum: int) -> 'Partition':
+        # each node is a cluster by itself, cluster i = {i}
+        return cls(array.array('i', range(vnum)))
+
+    def members(self, cid):
+        """
+        :return: an iterator of the nodes of the cluster
+        """
+        nxt = self.next
+        node = self.head[cid] if cid < len(self.head) else -1
+        while node != -1:
+            # the next node is read first, the current one may be moved by the caller
+            following = nxt[node]
+            yield node
+            node = following
+
+    def move(self, node, cid):
+        """
+        move a node into the cluster cid, a new cluster if cid is unused, O(1)
+
+        :return: None
+        """
+
+        source = self.label[node]
+        if source == cid:
+            return
+        if cid >= len(self.size):
+            grow = cid + 1 - len(self.size)
+            self.size.extend(array.array('i', bytes(4 * grow)))
+            self.head.extend(array.array('i', [-1]) * grow)
+
+        nxt, prev, head, size = self.next, self.prev, self.head, self.size
+        # unlink
+        before, after = prev[node], nxt[node]
+        if before == -1:
+            head[source] = after
+        else:
+            nxt[before] = after
+        if after != -1:
+            prev[after] = before
+        size[source] -= 1
+        if not size[source]:
+            self.count -= 1
+
+        # push front
+        first = head[cid]
+        if first == -1:
+            self.count += 1
+        else:
+            prev[first] = node
+        nxt[node] = first
+        prev[node] = -1
+        head[cid] = node
+        size[cid] += 1
+        self.label[node] = cid
+
+    def merge(self, c1, c2):
+        """
+        move all the nodes of c2 into c1, O(size of c2), the list of c2 is spliced in front of c1
+
+        :return: None
+        """
+
+        if c1 == c2 or c2 not in self:
+            return
+        if c1 not in self:
+            # c2 is renamed
+            for node in self.members(c2):
+                self.move(node, c1)
+            return
+
+        label, nxt = self.label, self.next
+        tail = -1
+        for node in self.members(c2):
+            label[node] = c1
+            tail = node
+        first = self.head[c1]
+        nxt[tail] = first
+        self.prev[first] = tail
+        self.head[c1] = self.head[c2]
+        self.head[c2] = -1
+        self.size[c1] += self.size[c2]
+        self.size[c2] = 0
+        self.count -= 1
+
+    def copy(self) -> 'Partition':
+        # the arrays are copied as blocks of memory
+        partition = Partition.__new__(Partition)
+        partition.label, partition.size, partition.head = self.label[:], self.size[:], self.head[:]
+        partition.next, partition.prev = self.next[:], self.prev[:]
+        partition.count = self.count
+        return partition
+
+    def canonical(self) -> array.array:
+        """
+        :return: the labels renumbered by the first appearance of each cluster, equal for equal partitions
+        """
+
+        mapping = {}
+        return array.array('i', [mapping.setdefault(cid, len(mapping)) for cid in self.label])
+
+    def fingerprint(self) -> bytes:
+        """
+        :return: a hash of the partition regardless of the cluster ids, e.g. to detect revisited solutions
+        """
+        return hashlib.blake2b(self.canonical().tobytes(), digest_size=16).digest()
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.label, self.size, self.head, self.next, self.prev))
+
+    def __getitem__(self, cid) -> ClusterView:
+        if cid not in self:
+            raise KeyError(cid)
+        return ClusterView(self, cid)
+
+    def __contains__(self, cid):
+        return 0 <= cid < len(self.size) and self.size[cid] > 0
+
+    def __len__(self):
+        # number of non-empty clusters
+        return self.count
+
+    def __iter__(self):
+        size = self.size
+        return (cid for cid in range(len(size)) if size[cid])
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (ClusterView(self, cid) for cid in self)
+
+    def items(self):
+        return ((cid, ClusterView(self, cid)) for cid in self)
+
+    def to_dict(self) -> dict:
+        """
+        :return: the partition as a dict(cluster_id: set())
+        """
+        return {cid: set(self.members(cid)) for cid in self}
+
+
+# binary cache of a dataset, stored next to the text file
+CACHE_SUFFIX = '.cache'
+# magic, version, byte order, network type, sha256 of the text file,
+# vnum and enum of the header, vnum of the graph, number of stored edges, 2 * number of stored edges
+_CACHE_HEADER = struct.Struct('<4sBcc1x32s5q')
+_CACHE_MAGIC = b'SGB\x00'
+_CACHE_VERSION = 1
+
+
+def file_digest(path: str, block_size=1 << 20) -> bytes:
+    """
+    content hash of a file, used to validate a binary cache against its text file
+
+    :param path: file path
+    :param block_size: size of the blocks read at a time
+    :return: sha256 digest
+    """
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def save_binary(dataset: Dataset, path: str, digest=bytes(32), network_type='signed'):
+    """
+    write a dataset in the binary format: a header followed by the CSR arrays and the edge arrays
+    Layout: header | offset, split (int64) | neighbor, n1, n2 (int32) | sign, edge sign (int8)
+    The file is written to a temporary file of its own first and then renamed, so a reader never sees a partial file
+    and processes caching the same dataset at the same time do not get in the way of each other.
+
+    :param dataset: an instance of class Dataset
+    :param path: file path
+    :param digest: content hash of the text file the dataset is read from, see file_digest()
+    :param network_type: enum {"unsigned", "signed"}
+    :return: path
+    """
+
+    g = dataset.graph
+    us, vs, signs = g.edge_arrays()
+    header = _CACHE_HEADER.pack(_CACHE_MAGIC, _CACHE_VERSION, sys.byteorder[0].encode(), network_type[0].encode(),
+                                digest, dataset.vnum, dataset.enum, g.vnum, len(us), len(g.neighbor))
+
+    tmp_path = '%s.%d.%s.tmp' % (path, os.getpid(), uuid.uuid4().hex[:8])
+    try:
+        with open(tmp_path, 'xb') as f:
+            f.write(header)
+            for typecode, data in (('q', g.offset), ('q', g.split), ('i', g.neighbor), ('i', us), ('i', vs),
+                                   ('b', g.sign), ('b', signs)):
+                if data.itemsize != struct.calcsize(typecode):
+                    data = array.array(typecode, data)
+                f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # the replace fails where the file is in use, e.g. mapped by another process on Windows,
+        # the same dataset cached by another process in the meantime is as good
+        if load_binary(path, digest=digest, network_type=network_type) is None:
+            raise
+
+    return path
+
+
+def load_binary(path: str, digest=None, network_type='signed') -> Dataset or None:
+    """
+    open a dataset in the binary format through mmap, the arrays of the graph are views of the mapped file
+
+    :param path: file path
+    :param digest: optional, the expected content hash of the text file
+    :param network_type: enum {"unsigned", "signed"}
+    :return: an instance of class Dataset, None if the file is missing, stale or written on another platform
+    """
+
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+    with f:
+        if os.fstat(f.fileno()).st_size < _CACHE_HEADER.size:
+            return None
+        # the mapping stays alive as long as a view of it exists
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, byteorder, kind, file_hash, vnum, enum, graph_vnum, m, nnz = \
+        _CACHE_HEADER.unpack_from(buffer)
+    if magic != _CACHE_MAGIC or version != _CACHE_VERSION or byteorder != sys.byteorder[0].encode() or \
+            kind != network_type[0].encode() or (digest is not None and file_hash != digest):
+        buffer.close()
+        return None
+
+    layout = (('q', graph_vnum + 1), ('q', graph_vnum), ('i', nnz), ('i', m), ('i', m), ('b', nnz), ('b', m))
+    if _CACHE_HEADER.size + sum(length * struct.calcsize(typecode) for typecode, length in layout) != len(buffer):
+        buffer.close()
+        return None
+
+    view = memoryview(buffer)
+    arrays = []
+    position = _CACHE_HEADER.size
+    for typecode, length in layout:
+        size = length * struct.calcsize(typecode)
+        arrays.append(view[position:position + size].cast(typecode))
+        position += size
+    offset, split, neighbor, us, vs, sign, signs = arrays
+
+    dataset = Dataset()
+    dataset.vnum, dataset.enum = vnum, enum
+    dataset.graph = SignedGraph(graph_vnum, offset, split, neighbor, sign, edge_list=(us, vs, signs))
+    return dataset
+
+
+class EdgeData:
+    """
+    data structure for the edges parsed from a .g file
+
+    vnum：num of vertices in the header, int
+    enum：num of edges in the header, int
+    us, vs, signs: parallel arrays of the valid edges in the order of the file,
+                   numpy.ndarray when numpy is available, array.array otherwise
+    info: statistics of the file, see get_dataset_info()
+    """
+    def __init__(self, vnum, enum, us, vs, signs, info):
+        self.vnum = vnum
+        self.enum = enum
+        self.us = us
+        self.vs = vs
+        self.signs = signs
+        self.info = info
+
+
+_SIGNS = {b'1': 1, b'-1': -1}
+
+
+def _next_line_start(f, position: int, block_size=1 << 16) -> int:
+    """
+    :return: the position after the first line terminator ("\\n" or "\\r") at or after position
+    """
+
+    f.seek(position)
+    while True:
+        block = f.read(block_size)
+        if not block:
+            return position
+        ends = [i for i in (block.find(b'\n'), block.find(b'\r')) if i >= 0]
+        if ends:
+            return position + min(ends) + 1
+        position += len(block)
+
+
+def _token_counts(tokens: list, columns: int) -> tuple:
+    # the counts (positive, negative, zero, lines) of the tokens of whole lines
+    lines = len(tokens) // columns
+    if columns == 3:
+        sign_tokens = tokens[2::3]
+        return sign_tokens.count(b'1'), sign_tokens.count(b'-1'), sign_tokens.count(b'0'), lines
+    return lines, 0, 0, lines
+
+
+def _parse_tokens(tokens: list, network_type: str, index_base: int):
+    """
+    parse the whitespace separated tokens of whole lines token by token, used without numpy
+    and for the blocks which are not plain integers
+
+    :return: us, vs, signs of the valid edges and the counts (positive, negative, zero, lines)
+    """
+
+    columns = 3 if network_type == 'signed' else 2
+    n1s, n2s = tokens[0::columns], tokens[1::columns]
+    counts = _token_counts(tokens, columns)
+    lines = counts[3]
+    if columns == 3:
+        # signs other than 1 and -1 are marked by 0 and filtered
+        signs = array.array('b', map(_SIGNS.get, tokens[2::3], itertools.repeat(0)))
+    else:
+        signs = array.array('b', [1]) * lines
+    valid = counts[0] + counts[1] if columns == 3 else lines
+
+    if np is not None:
+        us = np.fromiter(map(int, n1s), dtype=np.int64, count=lines)
+        vs = np.fromiter(map(int, n2s), dtype=np.int64, count=lines)
+        signs = np.array(signs, dtype=np.int8)
+        if valid < lines:
+            keep = signs != 0
+            us, vs, signs = us[keep], vs[keep], signs[keep]
+        if index_base:
+            us -= index_base
+            vs -= index_base
+    else:
+        us, vs = array.array('i', map(int, n1s)), array.array('i', map(int, n2s))
+        if valid < lines:
+            keep = [s != 0 for s in signs]
+            us, vs = array.array('i', itertools.compress(us, keep)), array.array('i', itertools.compress(vs, keep))
+            signs = array.array('b', itertools.compress(signs, keep))
+        if index_base:
+            us = array.array('i', [u - index_base for u in us])
+            vs = array.array('i', [v - index_base for v in vs])
 
+    return us, vs, signs, counts
 
-def load_data(path: str, network_type='signed') -> Dataset:
+
+def _split_lines(path: str, data: bytes, position: int, columns: int) -> list:
+    """
+    split a block line by line, each non-empty line is expected to have the given number of tokens
+
+    :param path: file path, to locate an invalid line
+    :param data: whole lines of the file
+    :param position: the offset of data in the file
+    :param columns: number of tokens per line
+    :return: the tokens of the block
+    """
+
+    # split once with the line terminators as b'|' tokens, the rows of columns tokens and a terminator are
+    # checked by a slice, a block with empty lines or other separators is split line by line instead
+    if b'|' not in data:
+        text = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n') if b'\r' in data else data
+        tokens = text.replace(b'\n', b' | ').split()
+        if text and not text.endswith(b'\n'):
+            tokens.append(b'|')
+        width = columns + 1
+        rows = len(tokens) // width
+        if len(tokens) == rows * width and tokens.count(b'|') == rows and tokens[columns::width].count(b'|') == rows:
+            del tokens[columns::width]
+            return tokens
+
+    lines = data.splitlines()
+    rows = list(map(bytes.split, lines))
+    if set(map(len, rows)) <= {0, columns}:
+        return list(itertools.chain.from_iterable(rows))
+
+    i = next(i for i, row in enumerate(rows) if len(row) not in (0, columns))
+    # the invalid line is rare, so the lines before it are only counted here
+    with open(path, 'rb') as f:
+        number = len(f.read(position).splitlines()) + i + 1
+    raise ValueError('line %d of %s: %r, each line is expected in the form of %s' %
+                     (number, path, lines[i].decode(errors='replace'), '"n1 n2 attr"' if columns == 3 else '"n1 n2"'))
+
+
+def _parse_columns(data: bytes, columns: int):
+    """
+    convert a block of whole lines into an int64 array of (lines, columns) at once, with numpy
+    Each token is assigned to its line by the positions of the line terminators. The tokens of every row
+    must be on one line and the rows on distinct lines, so every non-empty line has exactly columns tokens.
+
+    :param data: whole lines of the file
+    :param columns: number of tokens per line
+    :return: a numpy.ndarray, None if a line is not in the expected form or a token is not an integer
+    """
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    # the ASCII whitespace, as separated by bytes.split()
+    blank = (buffer == 32) | ((buffer >= 9) & (buffer <= 13))
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    tokens = np.flatnonzero(starts)
+    if len(tokens) % columns:
+        return None
+    if not len(tokens):
+        return np.empty((0, columns), dtype=np.int64)
+
+    # the line of each token, as the number of line terminators before it
+    rows = np.cumsum((buffer == 10) | (buffer == 13), dtype=np.int32)[tokens].reshape(-1, columns)
+    if not (rows[:, 0] == rows[:, -1]).all() or not (rows[1:, 0] > rows[:-1, 0]).all():
+        return None
+
+    # a token which is not an integer stops the conversion, reported by a warning or an error
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        try:
+            values = np.fromstring(data, dtype=np.int64, sep=' ')
+        except (ValueError, DeprecationWarning):
+            return None
+    if len(values) != len(tokens):
+        return None
+    return values.reshape(-1, columns)
+
+
+def _value_counts(values, columns: int) -> tuple:
+    # the counts (positive, negative, zero, lines) of the rows converted by _parse_columns()
+    lines = len(values)
+    if columns == 3:
+        signs = values[:, 2]
+        return (int(np.count_nonzero(signs == 1)), int(np.count_nonzero(signs == -1)),
+                int(np.count_nonzero(signs == 0)), lines)
+    return lines, 0, 0, lines
+
+
+def _parse_block(path: str, data: bytes, position: int, network_type: str, index_base: int):
+    """
+    parse a block of whole lines, column by column with numpy, token by token if it is not plain integers
+
+    :param path: file path, to locate an invalid line
+    :param data: whole lines of the file
+    :param position: the offset of data in the file
+    :return: us, vs, signs of the valid edges and the counts (positive, negative, zero, lines)
+    """
+
+    columns = 3 if network_type == 'signed' else 2
+    values = _parse_columns(data, columns) if np is not None else None
+    if values is None:
+        return _parse_tokens(_split_lines(path, data, position, columns), network_type, index_base)
+
+    counts = _value_counts(values, columns)
+    us, vs = values[:, 0], values[:, 1]
+    if columns == 3:
+        signs = values[:, 2]
+        if counts[0] + counts[1] < counts[3]:
+            keep = (signs == 1) | (signs == -1)
+            us, vs, signs = us[keep], vs[keep], signs[keep]
+        signs = signs.astype(np.int8)
+    else:
+        signs = np.ones(len(us), dtype=np.int8)
+    # copied out of the rows, the columns are contiguous then
+    us, vs = us - index_base, vs - index_base
+    return us, vs, signs, counts
+
+
+def _count_block(path: str, data: bytes, position: int, network_type: str) -> tuple:
+    """
+    the statistics of a block of whole lines, the node ids are not kept
+
+    :return: the counts (positive, negative, zero, lines)
+    """
+
+    columns = 3 if network_type == 'signed' else 2
+    values = _parse_columns(data, columns) if np is not None else None
+    if values is None:
+        return _token_counts(_split_lines(path, data, position, columns), columns)
+    return _value_counts(values, columns)
+
+
+def _blocks(path: str, start: int, end: int, block_size: int):
+    """
+    read the byte range [start, end) of a file in blocks of whole lines
+    Note: start and end are expected at the beginning of lines
+
+    :return: a generator of (offset of the block in the file, block)
+    """
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        rest = b''
+        while position < end:
+            block = f.read(min(block_size, end - position))
+            if not block:
+                break
+            position += len(block)
+            data = rest + block
+            if position < end:
+                # the incomplete last line is carried to the next block
+                cut = max(data.rfind(b'\n'), data.rfind(b'\r')) + 1
+                data, rest = data[:cut], data[cut:]
+            else:
+                rest = b''
+            yield position - len(data) - len(rest), data
+        if rest:
+            yield position - len(rest), rest
+
+
+def _parse_range(path: str, start: int, end: int, network_type: str, index_base: int, block_size: int):
+    """
+    parse the lines in the byte range [start, end) of a file, block by block
+
+    :return: us, vs, signs of the valid edges and the counts (positive, negative, zero, lines)
+    """
+
+    return _concatenate_parts([_parse_block(path, data, position, network_type, index_base)
+                               for position, data in _blocks(path, start, end, block_size)])
+
+
+def _count_range(path: str, start: int, end: int, network_type: str, block_size: int) -> tuple:
+    """
+    count the signs of the lines in the byte range [start, end) of a file, block by block
+
+    :return: the counts (positive, negative, zero, lines)
+    """
+
+    parts = [_count_block(path, data, position, network_type)
+             for position, data in _blocks(path, start, end, block_size)]
+    return tuple(sum(c) for c in zip(*parts)) or (0, 0, 0, 0)
+
+
+def _concatenate_parts(parts: list):
+    counts = tuple(sum(c) for c in zip(*[part[3] for part in parts])) or (0, 0, 0, 0)
+    if np is not None:
+        if not parts:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int8), counts
+        return tuple(np.concatenate([part[i] for part in parts]) for i in range(3)) + (counts,)
+
+    us, vs, signs = array.array('i'), array.array('i'), array.array('b')
+    for part in parts:
+        us.extend(part[0])
+        vs.extend(part[1])
+        signs.extend(part[2])
+    return us, vs, signs, counts
+
+
+def _file_ranges(path: str, workers: int):
+    """
+    read the header and split the lines after it into byte ranges at line boundaries
+
+    :return: vnum, enum of the header and the bounds of the ranges
+    """
+
+    with open(path, 'rb') as f:
+        # the first line
+        header_end = _next_line_start(f, 0)
+        f.seek(0)
+        vnum, enum = f.read(header_end).split()
+        size = os.fstat(f.fileno()).st_size
+
+        bounds = [header_end]
+        for i in range(1, workers):
+            bounds.append(max(bounds[-1], _next_line_start(f, header_end + (size - header_end) * i // workers)))
+        bounds.append(size)
+
+    return int(vnum), int(enum), bounds
+
+
+def _map_ranges(function, path: str, bounds: list, *args) -> list:
+    # function(path, start, end, *args) of each range, on worker processes if there are several ranges
+    if len(bounds) > 2:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(bounds) - 1) as executor:
+            return list(executor.map(function, itertools.repeat(path), bounds[:-1], bounds[1:],
+                                     *map(itertools.repeat, args)))
+    return [function(path, bounds[0], bounds[1], *args)]
+
+
+def _edge_info(vnum: int, enum: int, counts: tuple) -> dict:
+    penum, nenum, zenum, _ = counts
+    return {
+        'vnum': vnum,
+        'enum': enum,
+        'positive enum': penum,
+        'negative enum': nenum,
+        'zero enum': zenum,
+        'left': enum - penum - nenum - zenum
+    }
+
+
+def parse_edges(path: str, network_type='signed', index_base=0, workers=1, block_size=1 << 22) -> EdgeData:
+    """
+    read the edges of a .g file in large blocks, converted column by column with numpy when available
+    Lines with a sign other than 1 or -1 are filtered, the statistics of the file are collected in the same pass.
+
+    :param path: file path
+    :param network_type: enum {"unsigned", "signed"}
+    :param index_base: the number of the first node in the file, 1 for files starting from one
+    :param workers: number of worker processes, the file is split by byte ranges at line boundaries
+    :param block_size: size of the blocks read at a time
+    :return: an instance of class EdgeData
+    """
+
+    if network_type != 'signed' and network_type != 'unsigned':
+        raise TypeError('no such type of network')
+
+    vnum, enum, bounds = _file_ranges(path, workers)
+    parts = _map_ranges(_parse_range, path, bounds, network_type, index_base, block_size)
+    us, vs, signs, counts = _concatenate_parts(parts)
+    return EdgeData(vnum, enum, us, vs, signs, _edge_info(vnum, enum, counts))
+
+
+def deduplicate_edges(us, vs, signs):
+    """
+    remove the duplicated undirected edges, the last occurrence of an edge wins
+
+    :param us: one end of each edge
+    :param vs: the other end of each edge
+    :param signs: sign of each edge
+    :return: us, vs, signs without duplicated edges, in the order of the last occurrences
+    """
+
+    if np is not None:
+        us, vs, signs = np.asarray(us), np.asarray(vs), np.asarray(signs)
+        if not len(us):
+            return us, vs, signs
+        lo, hi = np.minimum(us, vs).astype(np.int64), np.maximum(us, vs).astype(np.int64)
+        key = lo * (int(hi.max()) + 1) + hi
+        # the first occurrence in the reversed order is the last one
+        _, idx = np.unique(key[::-1], return_index=True)
+        if len(idx) == len(key):
+            return us, vs, signs
+        keep = np.sort(len(key) - 1 - idx)
+        return us[keep], vs[keep], signs[keep]
+
+    seen = set()
+    keep = []
+    for i in range(len(us) - 1, -1, -1):
+        key = (us[i], vs[i]) if us[i] < vs[i] else (vs[i], us[i])
+        if key not in seen:
+            seen.add(key)
+            keep.append(i)
+    if len(keep) == len(us):
+        return us, vs, signs
+    keep.reverse()
+    return (array.array('i', [us[i] for i in keep]), array.array('i', [vs[i] for i in keep]),
+            array.array('b', [signs[i] for i in keep]))
+
+
+def load_data(path: str, network_type='signed', cache=False, workers=1) -> Dataset:
     """
     read data from a local file
 
     :param path: file path
     :param network_type: enum {"unsigned", "signed"}
+    :param cache: use the binary cache next to the file (path + CACHE_SUFFIX), it is written on the first load
+                  and rebuilt when the content of the file changes
+    :param workers: number of worker processes parsing the file, see parse_edges()
     :return: an instance of class Dataset
     """
 
+    if cache:
+        digest = file_digest(path)
+        dataset = load_binary(path + CACHE_SUFFIX, digest=digest, network_type=network_type)
+        if dataset is None:
+            dataset = load_data(path, network_type=network_type, workers=workers)
+            save_binary(dataset, path + CACHE_SUFFIX, digest=digest, network_type=network_type)
+        return dataset
+
     dataset = Dataset()
-    data = collections.defaultdict(lambda: collections.defaultdict(lambda: 0))
     print('Loading data from ' + path)
 
-    with open(path) as f:
-        # the first line
-        header = f.readline()
-        vnum, enum = header.split()
-        dataset.vnum, dataset.enum = int(vnum), int(enum)
-        # the remaining
-        if network_type == 'signed':
-            # each line in the file is expected in the form of "n1 n2 attr"
-            for each in f:
-                n1, n2, attr = each.split()
-                if attr != '1' and attr != '-1':
-                    continue
-                n1, n2 = int(n1), int(n2)
-                data[n1][n2] = data[n2][n1] = int(attr)
-        elif network_type == 'unsigned':
-            # expected form: "n1 n2"
-            for each in f:
-                n1, n2 = each.split()
-                n1, n2 = int(n1), int(n2)
-                data[n1][n2] = data[n2][n1] = 1
-        else:
-            raise TypeError('no such type of network')
-
-    dataset.data = data
+    # each line in the file is expected in the form of "n1 n2 attr", or "n1 n2" for unsigned networks
+    edges = parse_edges(path, network_type=network_type, workers=workers)
+    dataset.vnum, dataset.enum = edges.vnum, edges.enum
+    dataset.graph = SignedGraph.from_edges(dataset.vnum, *deduplicate_edges(edges.us, edges.vs, edges.signs))
     print('Loading complete!')
 
     return dataset
@@ -79,96 +1231,66 @@ def load_data_with_start_one(path: str, network_type: str) -> Dataset:
 
     """
     dataset = Dataset()
-    data = collections.defaultdict(dict)
-    with open(path) as f:
-        header = f.readline()
-        vnum, enum = header.split()
-        dataset.vnum, dataset.enum = int(vnum), int(enum)
-        if network_type == 'signed':
-            for each in f:
-                n1, n2, attr = each.split()
-                n1, n2 = int(n1)-1, int(n2)-1
-                data[n1][n2] = data[n2][n1] = int(attr)
-        elif network_type == 'unsigned':
-            for each in f:
-                n1, n2 = each.split()
-                n1, n2 = int(n1)-1, int(n2)-1
-                data[n1][n2] = data[n2][n1] = 1
-        else:
-            raise TypeError('no such type of network')
-    dataset.data = data
+    edges = parse_edges(path, network_type=network_type, index_base=1)
+    dataset.vnum, dataset.enum = edges.vnum, edges.enum
+    dataset.graph = SignedGraph.from_edges(dataset.vnum, *deduplicate_edges(edges.us, edges.vs, edges.signs))
     return dataset
 
 
-def partition2solution(partition: dict, vnum: int, solution_type='list') -> dict or np.array:
+def partition2solution(partition: dict or Partition, vnum: int, solution_type='list') -> dict or np.array:
     """
     convert a partition into a solution vector
 
     :param solution_type: enum {"array", "dict" or ""}
-    :param partition: a dictionary
+    :param partition: a Partition or a dictionary
     :param vnum: number of vertices in the partition
     :return: required solution, default: a list
     """
 
-    solution = [0] * vnum
-    for idx, community in partition.items():
-        for node in community:
-            solution[node] = idx
+    if isinstance(partition, Partition):
+        # the labels of a Partition are the solution vector already
+        solution = partition.label.tolist()
+    else:
+        solution = [0] * vnum
+        for idx, community in partition.items():
+            for node in community:
+                solution[node] = idx
 
     if solution_type == 'array':
-        print('The support of numpy is removed.')
-        return
-        # return np.array(solution)
+        if np is None:
+            print('The support of numpy is not available.')
+            return
+        return np.array(solution)
     elif solution_type == 'dict':
         return {i: solution[i] for i in range(vnum)}
     else:
         return solution
 
 
-def solution2partition(solution: dict or np.array or list) -> dict:
+def solution2partition(solution: dict or np.array or list) -> Partition:
     """
     convert a solution vector into a partition
 
-    :param solution: a solution vector, iterable
-    :return: a partition, dict(cluster_id: set())
+    :param solution: a solution vector, list, dict, array or numpy.ndarray
+    :return: a Partition, partition.label is a copy of the solution vector
     """
 
-    partition = collections.defaultdict(set)
-
-    if isinstance(solution, dict):
-        for node, comm in solution.items():
-            partition[comm].add(node)
-
-#     elif isinstance(solution, np.ndarray):
-#         for node, comm in enumerate(solution):
-#             if comm not in partition.keys():
-#                 partition[comm] = {node}
-#             else:
-#                 partition[comm].add(node)
-
-    elif isinstance(solution, list):
-        for node, comm in enumerate(solution):
-            partition[comm].add(node)
-
-    else:
+    if not isinstance(solution, (dict, list, array.array)) and \
+            not (np is not None and isinstance(solution, np.ndarray)):
         raise TypeError('Wrong type of solution')
-
-    return partition
+    return Partition.from_solution(solution)
 
 
-def default_initialization(vnum: int) -> (list or dict, dict):
+def default_initialization(vnum: int) -> (array.array, Partition):
     """
     Initialization: treat each node as an independent cluster
 
     :param vnum: number of vertices in a network
-    :return: a solution vector and a partition
+    :return: a solution vector and a partition, the solution vector is partition.label
     """
 
-    partition = dict()
-    solution = dict(enumerate(list(range(vnum))))
-    for i in range(vnum):
-        partition[i] = {i}
-    return solution, partition
+    partition = Partition.singletons(vnum)
+    return partition.label, partition
 
 
 def reform_partition(partition: dict) -> dict:
@@ -187,23 +1309,89 @@ def reform_partition(partition: dict) -> dict:
     return re_partition
 
 
-def dataset2g(dataset, file_name='generated_dataset'):
+def chunk_edges(edges, chunk_size=1 << 16):
     """
-    write a generated dataset to a local file
+    group a stream of single edges into chunks for write_edges()
+
+    :param edges: an iterable of (n1, n2, sign)
+    :param chunk_size: number of edges in a chunk
+    :return: a generator of (n1 list, n2 list, sign list) chunks
+    """
+
+    edges = iter(edges)
+    while True:
+        block = list(itertools.islice(edges, chunk_size))
+        if not block:
+            return
+        yield tuple(list(column) for column in zip(*block))
+
+
+def write_edges(path: str, vnum: int, chunks, enum=None, binary=False, buffer_size=1 << 22):
+    """
+    write edges into a .g file, a line per edge, the edges are formatted chunk by chunk and written in large blocks
+    Note: the edges are written as given, see deduplicate_edges() for the duplicates
+
+    :param path: file path
+    :param vnum: number of nodes
+    :param chunks: an iterable of (n1 array, n2 array, sign array), e.g. [graph.edge_arrays()] or a generator,
+                   see chunk_edges() for a stream of single edges
+    :param enum: number of edges, counted while writing if None (the header is rewritten at the end)
+    :param binary: also write the binary cache of the file (path + CACHE_SUFFIX), the edges are kept in memory
+    :param buffer_size: size of the write buffer
+    :return: path
+    """
+
+    parts = []
+    count = 0
+    # an unknown number of edges is written into a padded header later
+    header = ('%d\t%d' % (vnum, enum) if enum is not None else '%d\t' % vnum + ' ' * 20) + '\n'
+
+    with open(path, 'wb', buffering=buffer_size) as f:
+        f.write(header.encode())
+        for us, vs, signs in chunks:
+            if binary:
+                parts.append((us, vs, signs))
+            if np is not None and isinstance(us, np.ndarray):
+                us, vs, signs = us.tolist(), vs.tolist(), np.asarray(signs).tolist()
+            f.write(''.join(['%d\t%d\t%d\n' % edge for edge in zip(us, vs, signs)]).encode())
+            count += len(us)
+
+        if enum is None:
+            f.seek(0)
+            f.write(('%d\t%d' % (vnum, count)).ljust(len(header) - 1).encode())
+        elif enum != count:
+            raise ValueError('%d edges are written, but the header says %d' % (count, enum))
+
+    if binary:
+        if np is not None:
+            us, vs, signs = (np.concatenate([np.asarray(part[i]) for part in parts]) if parts else
+                             np.empty(0, dtype=np.int64) for i in range(3))
+        else:
+            us, vs, signs = (array.array(typecode, itertools.chain.from_iterable(part[i] for part in parts))
+                             for i, typecode in enumerate('iib'))
+        # the same dataset as load_data() reading the text file
+        dataset = Dataset()
+        dataset.vnum, dataset.enum = vnum, count
+        dataset.graph = SignedGraph.from_edges(vnum, *deduplicate_edges(us, vs, signs))
+        save_binary(dataset, path + CACHE_SUFFIX, digest=file_digest(path))
+
+    return path
+
+
+def dataset2g(dataset, file_name='generated_dataset', binary=False):
+    """
+    write a generated dataset to a local file, each undirected edge once
 
     :param file_name: give the file a name
     :param dataset: an instance of class Dataset
+    :param binary: also write the binary cache of the file, see write_edges()
     :return: file_name
     """
 
     import time
     file_name = file_name + "_" + str(int(time.time())) + ".g"   # add a time stamp
 
-    with open(file_name, 'w') as f:
-        f.write(str(dataset.vnum) + '\t' + str(dataset.enum) + '\n')
-        for node in dataset.data:
-            for nbr, attr in dataset.data[node].items():
-                f.write(str(node) + '\t' + str(nbr) + '\t' + str(attr) + '\n')
+    write_edges(file_name, dataset.vnum, [dataset.graph.edge_arrays()], binary=binary)
 
     print('-> The dataset is write as ' + file_name)
     return file_name
@@ -246,12 +1434,12 @@ def dataset2g(dataset, file_name='generated_dataset'):
 #     matplotlib.pyplot.show()
 
 
-def collect_degree_info(dataset: Dataset, neighborhood) -> dict:
+def collect_degree_info(dataset: Dataset, graph: SignedGraph) -> dict:
 
     degree = dict()
     for i in range(dataset.vnum):
-        pos_degree = len(neighborhood[i]['+'])
-        neg_degree = len(neighborhood[i]['-'])
+        pos_degree = graph.positive_degree(i)
+        neg_degree = graph.negative_degree(i)
         i_degree = {
             '+': pos_degree,
             '-': neg_degree
@@ -261,16 +1449,16 @@ def collect_degree_info(dataset: Dataset, neighborhood) -> dict:
     return degree
 
 
-def check_node_list(vnum, neighbor: dict):
+def check_node_list(vnum, graph: SignedGraph):
 
     alone = set()
     isolated = set()
 
     for i in range(vnum):
-        if i not in neighbor.keys():
+        if not graph.degree(i):
             alone.add(i)
             continue
-        if not neighbor[i]['+']:
+        if not graph.positive_degree(i):
             isolated.add(i)
 
     node_available = set(range(vnum)) - alone - isolated
@@ -284,26 +1472,32 @@ def get_mean_and_std(data: list):
     return mean, std
 
 
-def get_dataset_info(path):
-    dataset_info = {}
-    with open(path) as f:
-        header = f.readline()
-        vnum, enum = header.split()
-        dataset_info["vnum"], dataset_info["enum"] = int(vnum), int(enum)
-        penum, nenum, zenum = 0, 0, 0
-        for each in f:
-            n1, n2, attr = each.split()
-            if attr == '1':
-                penum += 1
-            elif attr == '-1':
-                nenum += 1
-            elif attr == '0':
-                zenum += 1
-        dataset_info["positive enum"] = penum
-        dataset_info["negative enum"] = nenum
-        dataset_info['zero enum'] = zenum
-        dataset_info['left'] = int(enum) - penum - nenum - zenum
-    return dataset_info
+def get_dataset_info(path, workers=1, block_size=1 << 22) -> dict:
+    """
+    statistics of a .g file, the signs are counted without keeping the edges
+
+    :param path: file path
+    :param workers: number of worker processes, see parse_edges()
+    :param block_size: size of the blocks read at a time
+    :return: dict(vnum, enum, positive enum, negative enum, zero enum, left)
+    """
+
+    vnum, enum, bounds = _file_ranges(path, workers)
+    parts = _map_ranges(_count_range, path, bounds, 'signed', block_size)
+    return _edge_info(vnum, enum, tuple(sum(c) for c in zip(*parts)))
+
+
+def read_header(path: str) -> (int, int):
+    """
+    read the first line of a .g file only, e.g. to estimate the cost of a dataset without parsing it
+
+    :param path: file path
+    :return: vnum and enum of the header
+    """
+
+    with open(path, 'rb') as f:
+        vnum, enum = f.readline().split()[:2]
+    return int(vnum), int(enum)
 
 
 def estimate_community_numbers(n):
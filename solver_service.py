@@ -0,0 +1,681 @@
+import io
+import os
+import json
+import time
+import array
+import queue
+import shutil
+import socket
+import hashlib
+import tempfile
+import argparse
+import itertools
+import threading
+import contextlib
+import collections
+import socketserver
+import multiprocessing
+import concurrent.futures
+import random as rd
+import signed_utils as utils
+import iterated_greedy_algorithm as ig
+from module.termination import Termination, TimeBudget, TargetValue
+
+
+"""
+A long-running solver service of IG.
+A job names a dataset file or carries its edges inline. The jobs run on a process pool, each with its own time
+budget, and every worker keeps the graphs it has parsed in a bounded LRU cache, so a job sends only the key of its
+graph and its parameters. A job can be cancelled and streams its events:
+    'queued', 'started', 'progress' (iteration, value), then one of 'done', 'failed', 'cancelled'
+The service is reached through a local TCP socket (SolverServer and SocketClient, one JSON object per line),
+or within the same process through LocalClient, which has the same methods and needs no network.
+"""
+
+# parameters of a job and their default values
+JOB_DEFAULTS = {'max_iter': 200, 'time_budget': None, 'beta': 0.3, 'seed': None, 'lower_bound': True,
+                'target': None, 'progress_interval': 1.0}
+FINAL_EVENTS = ('done', 'failed', 'cancelled')
+
+# the graph cache of a worker process, see _init_worker()
+_worker_state = {}
+
+
+def _init_worker(cache_size):
+    _worker_state['cache'] = GraphCache(cache_size)
+
+
+class ServiceError(Exception):
+    """
+    an error reported by the service, e.g. an unknown job or an invalid dataset
+    """
+    pass
+
+
+class JobMonitor(Termination):
+    """
+    sends the progress of a run to the service, stops the run only when the job is cancelled
+    """
+
+    def __init__(self, job_id, events, cancelled, interval=1.0):
+        """
+        :param job_id: id of the job
+        :param events: queue of (job id, event) read by the service
+        :param cancelled: the ids of the cancelled jobs
+        :param interval: min seconds between two progress events without improvement
+        """
+        self.job_id = job_id
+        self.events = events
+        self.cancelled = cancelled
+        self.interval = interval
+        self.best_value = None
+        self.last_time = 0
+
+    def start(self):
+        self.best_value = None
+        self.last_time = 0
+
+    def stop(self, iteration, value):
+        if self.job_id in self.cancelled:
+            return 'cancelled'
+        now = time.time()
+        if self.best_value is None or value < self.best_value or now - self.last_time >= self.interval:
+            self.best_value = value if self.best_value is None else min(value, self.best_value)
+            self.last_time = now
+            self.events.put((self.job_id, {'event': 'progress', 'iteration': iteration, 'value': value}))
+        return None
+
+
+def solve_job(job_id, key, path, params: dict, events, cancelled) -> dict:
+    """
+    run IG for a job, executed in a worker process, the graph is taken from the cache of the worker
+
+    :param job_id: id of the job
+    :param key: key of the graph, see GraphCache.key()
+    :param path: the file of the graph, read on a miss of the cache, see GraphCache.get()
+    :param params: parameters of the job, see JOB_DEFAULTS
+    :param events: queue of (job id, event) read by the service
+    :param cancelled: the ids of the cancelled jobs
+    :return: dict(value, solution, iterations, reason, lower_bound, time, cached)
+    """
+
+    start_time = time.time()
+    events.put((job_id, {'event': 'started'}))
+    cache = _worker_state['cache']
+    misses = cache.misses
+    entry = cache.get(key, path)
+    rd.seed(params['seed'])
+
+    termination = JobMonitor(job_id, events, cancelled, params['progress_interval'])
+    if params['time_budget'] is not None:
+        termination = termination | TimeBudget(params['time_budget'])
+    if params['target'] is not None:
+        termination = termination | TargetValue(params['target'])
+
+    lower_bound = None
+    if params['lower_bound']:
+        # the bound of a graph is computed by its first job, the later ones reuse it
+        lower_bound = entry['lower_bound'] if entry['lower_bound'] is not None else True
+    with contextlib.redirect_stdout(io.StringIO()):
+        alg = ig.IteratedGreedy(entry['dataset'], beta=params['beta'], neighborhood=entry['neighborhood'])
+        best_values, reason = alg.run(max_iter=params['max_iter'], output=False, termination=termination,
+                                      lower_bound=lower_bound)
+    # the graph of the neighborhood is pruned by the first instance, it is shared from then on
+    entry['neighborhood'] = alg.neighborhood
+    if alg.lower_bound is not None:
+        entry['lower_bound'] = alg.lower_bound
+
+    obj = alg.objective_function
+    return {'value': obj.obj_value, 'solution': list(obj.solution), 'iterations': len(best_values),
+            'reason': reason, 'lower_bound': alg.lower_bound, 'time': time.time() - start_time,
+            'cached': cache.misses == misses}
+
+
+def inline_dataset(edges, vnum=None) -> utils.Dataset:
+    """
+    build a dataset from the edges given in a job
+
+    :param edges: a list of [n1, n2, sign]
+    :param vnum: optional, num of vertices, default: the largest node id + 1
+    :return: an instance of class Dataset
+    """
+
+    us, vs, signs = array.array('i'), array.array('i'), array.array('b')
+    for edge in edges:
+        if len(edge) != 3:
+            raise ValueError('an edge is expected as [n1, n2, sign], got %r' % (edge,))
+        n1, n2, attr = edge
+        if not isinstance(n1, int) or not isinstance(n2, int) or n1 < 0 or n2 < 0 or n1 == n2 or \
+                attr not in (1, -1):
+            raise ValueError('invalid edge %r' % (edge,))
+        us.append(n1)
+        vs.append(n2)
+        signs.append(attr)
+
+    largest = max(max(us, default=-1), max(vs, default=-1))
+    if vnum is None:
+        vnum = largest + 1
+    elif largest >= vnum:
+        raise ValueError('node %d is out of range of %d nodes' % (largest, vnum))
+
+    dataset = utils.Dataset()
+    dataset.vnum = vnum
+    dataset.graph = utils.SignedGraph.from_edges(vnum, *utils.deduplicate_edges(us, vs, signs))
+    dataset.enum = dataset.graph.enum
+    return dataset
+
+
+class GraphCache:
+    """
+    a bounded LRU cache of the parsed datasets and their neighborhoods, one in each worker process,
+    keyed by the file and its modification time, or by the content of the inline edges
+    """
+
+    def __init__(self, capacity=8):
+        """
+        :param capacity: max number of datasets kept
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @staticmethod
+    def key(spec: dict) -> tuple:
+        """
+        :param spec: a job with either 'path', or 'edges' and an optional 'vnum'
+        :return: ('path', absolute path, mtime, size) or ('edges', sha256 of the content)
+        """
+
+        if spec.get('path') is not None:
+            path = os.path.abspath(spec['path'])
+            stat = os.stat(path)
+            return 'path', path, stat.st_mtime_ns, stat.st_size
+        if spec.get('edges') is not None:
+            content = json.dumps([spec.get('vnum'), spec['edges']], separators=(',', ':')).encode()
+            return 'edges', hashlib.sha256(content).hexdigest()
+        raise ValueError("a job needs either 'path' or 'edges'")
+
+    def get(self, key, path) -> dict:
+        """
+        :param key: key of the graph, see key()
+        :param path: the file read on a miss, the .g file, or the binary file the service spooled the inline
+                     edges to, see SolverService.submit()
+        :return: dict(dataset, neighborhood, lower_bound), read on a miss, the neighborhood and the bound are
+                 None until the first job on the graph sets them
+        """
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        # read out of the lock, a concurrent miss of the same key reads it twice
+        if key[0] == 'path':
+            with contextlib.redirect_stdout(io.StringIO()):
+                dataset = utils.load_data(path, cache=True)
+        else:
+            dataset = utils.load_binary(path)
+            if dataset is None:
+                raise ValueError('the spooled graph %s is missing' % key[1])
+        entry = {'dataset': dataset, 'neighborhood': None, 'lower_bound': None}
+
+        with self.__lock:
+            self.misses += 1
+            self.__entries[key] = entry
+            while len(self.__entries) > self.capacity:
+                self.__entries.popitem(last=False)
+        return entry
+
+
+class Job:
+    """
+    the state of a job in the service
+    """
+
+    def __init__(self, job_id, params, source, key):
+        self.id = job_id
+        self.params = params
+        self.source = source
+        self.key = key
+        self.state = 'queued'
+        self.events = [{'event': 'queued'}]
+        self.result = None
+        self.future = None
+        self.submitted = time.time()
+
+    def info(self) -> dict:
+        return {'job': self.id, 'state': self.state, 'source': self.source, 'params': self.params,
+                'last_event': self.events[-1], 'submitted': self.submitted}
+
+
+class SolverService:
+    """
+    The class of the solver service: a job queue on a process pool whose workers cache the parsed graphs.
+    The methods are thread-safe, SolverServer calls them from one thread per connection.
+    """
+
+    def __init__(self, workers=None, cache_size=8, history=1000):
+        """
+        class initialization, the worker processes are started
+
+        :param workers: number of worker processes, default: number of CPUs,
+                        0: the jobs run one by one in a thread of this process, e.g. for tests
+        :param cache_size: max number of parsed graphs kept by each worker, see GraphCache,
+                           and of the inline graphs spooled for them
+        :param history: max number of finished jobs kept for status() and result()
+        """
+
+        self.cache_size = cache_size
+        self.history = history
+        self.jobs = collections.OrderedDict()
+        # the jobs which found their graph in the cache of their worker, and the ones which read it
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.__condition = threading.Condition()
+        self.__ids = itertools.count(1)
+        # the inline graphs are written once in the binary format, the workers read them through mmap
+        self.__spool = tempfile.mkdtemp(prefix='solver_service_')
+        self.__spooled = collections.OrderedDict()
+
+        if workers == 0:
+            self.__manager = None
+            self.__events, self.__cancelled = queue.Queue(), dict()
+            self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, initializer=_init_worker,
+                                                                    initargs=(cache_size,))
+        else:
+            # the queue and the dict live in a manager process, the workers reach them through proxies
+            self.__manager = multiprocessing.Manager()
+            self.__events, self.__cancelled = self.__manager.Queue(), self.__manager.dict()
+            self.__executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                                     initargs=(cache_size,))
+
+        self.__dispatcher = threading.Thread(target=self.__dispatch, daemon=True)
+        self.__dispatcher.start()
+
+    def submit(self, spec: dict):
+        """
+        queue a job, only the key of its graph and its parameters are sent to the worker
+        Note: a missing file and invalid inline edges fail at once, the content of a file is read by the worker
+
+        :param spec: dict(path=..., or edges=[[n1, n2, sign], ...] and vnum=..., and the parameters of JOB_DEFAULTS)
+        :return: id of the job
+        """
+
+        params = dict(JOB_DEFAULTS)
+        for key, value in spec.items():
+            if key in ('path', 'edges', 'vnum'):
+                continue
+            if key not in JOB_DEFAULTS:
+                raise ValueError('unknown parameter %r' % key)
+            params[key] = value
+        key = GraphCache.key(spec)
+        dataset = None
+        if key[0] == 'path':
+            path, source = key[1], spec['path']
+        else:
+            path = os.path.join(self.__spool, key[1] + utils.CACHE_SUFFIX)
+            source = '%d inline edges' % len(spec['edges'])
+            if key not in self.__spooled:
+                # checked out of the lock, the edges of a known graph are valid already
+                dataset = inline_dataset(spec['edges'], spec.get('vnum'))
+
+        with self.__condition:
+            if key[0] == 'edges':
+                if key not in self.__spooled:
+                    if dataset is None:
+                        dataset = inline_dataset(spec['edges'], spec.get('vnum'))
+                    self.__spooled[key] = utils.save_binary(dataset, path)
+                self.__spooled.move_to_end(key)
+            job = Job(next(self.__ids), params, source, key)
+            self.jobs[job.id] = job
+            self.__trim()
+            job.future = self.__executor.submit(solve_job, job.id, key, path, params, self.__events,
+                                                self.__cancelled)
+        job.future.add_done_callback(lambda future: self.__finish(job, future))
+        return job.id
+
+    def cancel(self, job_id) -> bool:
+        """
+        cancel a job, a queued job is dropped, a running one stops after its current iteration
+
+        :param job_id: id of the job
+        :return: False if the job is finished already
+        """
+
+        with self.__condition:
+            job = self.__job(job_id)
+            if job.state in FINAL_EVENTS:
+                return False
+            if not job.future.cancel():
+                self.__cancelled[job_id] = True
+            return True
+
+    def status(self, job_id) -> dict:
+        """
+        :param job_id: id of the job
+        :return: dict(job, state, source, params, last_event, submitted)
+        """
+        with self.__condition:
+            return self.__job(job_id).info()
+
+    def result(self, job_id, timeout=None) -> dict:
+        """
+        wait until the job is finished
+
+        :param job_id: id of the job
+        :param timeout: optional, seconds to wait
+        :return: the status of the job with its 'result' (see solve_job()), or its 'error'
+        """
+
+        with self.__condition:
+            job = self.__job(job_id)
+            if not self.__condition.wait_for(lambda: job.state in FINAL_EVENTS, timeout):
+                raise TimeoutError('job %d is not finished in %s s' % (job_id, timeout))
+            info = job.info()
+            if job.state == 'failed':
+                info['error'] = job.events[-1]['error']
+            elif job.result is not None:
+                info['result'] = job.result
+            return info
+
+    def watch(self, job_id, since=0, timeout=None):
+        """
+        stream the events of a job, the earlier ones first, until its final event
+
+        :param job_id: id of the job
+        :param since: number of events to skip
+        :param timeout: optional, max seconds to wait for the next event
+        :return: a generator of events
+        """
+
+        position = since
+        while True:
+            with self.__condition:
+                job = self.__job(job_id)
+                if not self.__condition.wait_for(lambda: len(job.events) > position, timeout):
+                    return
+                events = job.events[position:]
+            for event in events:
+                yield event
+            position += len(events)
+            if events[-1]['event'] in FINAL_EVENTS:
+                return
+
+    def stats(self) -> dict:
+        """
+        :return: number of jobs by state and the counters of the caches of the workers
+        """
+        with self.__condition:
+            states = collections.Counter(job.state for job in self.jobs.values())
+            return {'jobs': dict(states), 'cache': {'capacity': self.cache_size, 'hits': self.cache_hits,
+                                                    'misses': self.cache_misses, 'spooled': len(self.__spooled)}}
+
+    def close(self):
+        """
+        cancel the jobs left and stop the workers
+
+        :return: None
+        """
+
+        with self.__condition:
+            for job in self.jobs.values():
+                if job.state not in FINAL_EVENTS and not job.future.cancel():
+                    self.__cancelled[job.id] = True
+        self.__executor.shutdown(wait=True)
+        self.__events.put(None)
+        self.__dispatcher.join()
+        if self.__manager is not None:
+            self.__manager.shutdown()
+        shutil.rmtree(self.__spool, ignore_errors=True)
+
+    def __job(self, job_id) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ValueError('unknown job %r' % (job_id,))
+        return job
+
+    def __trim(self):
+        # the oldest finished jobs are forgotten first
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINAL_EVENTS]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self.jobs[job_id]
+        # the oldest spooled graphs beyond the cache size are removed, unless a job waits for one of them
+        used = {job.key for job in self.jobs.values() if job.state not in FINAL_EVENTS}
+        unused = [key for key in self.__spooled if key not in used]
+        for key in unused[:max(len(self.__spooled) - self.cache_size, 0)]:
+            os.remove(self.__spooled.pop(key))
+
+    def __dispatch(self):
+        # the events sent by the workers are appended to their jobs, the events after the final one are dropped
+        while True:
+            item = self.__events.get()
+            if item is None:
+                return
+            job_id, event = item
+            with self.__condition:
+                job = self.jobs.get(job_id)
+                if job is None or job.state in FINAL_EVENTS:
+                    continue
+                if event['event'] == 'started':
+                    job.state = 'running'
+                job.events.append(event)
+                self.__condition.notify_all()
+
+    def __finish(self, job, future):
+        with self.__condition:
+            if future.cancelled():
+                event = {'event': 'cancelled'}
+            elif future.exception() is not None:
+                error = future.exception()
+                event = {'event': 'failed', 'error': '%s: %s' % (type(error).__name__, error)}
+            else:
+                job.result = future.result()
+                if job.result['cached']:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+                event = {'event': 'cancelled' if job.result['reason'] == 'cancelled' else 'done'}
+                event.update({key: job.result[key] for key in ('value', 'reason', 'iterations', 'time')})
+            job.state = event['event']
+            job.events.append(event)
+            self.__cancelled.pop(job.id, None)
+            self.__condition.notify_all()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    one JSON request per line, e.g. {"op": "submit", "job": {"path": ..., "time_budget": 10}},
+    answered by one JSON line, or by a line per event for "watch"
+    """
+
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request.get('op')
+                if op == 'watch':
+                    for event in service.watch(request['job'], request.get('since', 0), request.get('timeout')):
+                        self.__send(event)
+                    continue
+                if op == 'submit':
+                    response = {'job': service.submit(request['job'])}
+                elif op == 'cancel':
+                    response = {'cancelled': service.cancel(request['job'])}
+                elif op == 'status':
+                    response = service.status(request['job'])
+                elif op == 'result':
+                    response = service.result(request['job'], request.get('timeout'))
+                elif op == 'stats':
+                    response = service.stats()
+                else:
+                    raise ValueError('unknown op %r' % op)
+            except Exception as error:
+                response = {'error': '%s: %s' % (type(error).__name__, error)}
+            self.__send(response)
+
+    def __send(self, message):
+        self.wfile.write(json.dumps(message).encode() + b'\n')
+        self.wfile.flush()
+
+
+class SolverServer(socketserver.ThreadingTCPServer):
+    """
+    the TCP front end of a SolverService, bound to the loopback interface by default
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, service: SolverService, host='127.0.0.1', port=0):
+        """
+        :param service: an instance of class SolverService
+        :param host: address to listen on
+        :param port: port to listen on, 0: any free port, see server_address
+        """
+        self.service = service
+        super().__init__((host, port), _RequestHandler)
+
+
+class SocketClient:
+    """
+    a client of a SolverServer, one connection per request
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, timeout=None):
+        self.address = (host, port)
+        self.timeout = timeout
+
+    def submit(self, spec: dict):
+        return self.__call({'op': 'submit', 'job': spec})['job']
+
+    def cancel(self, job_id) -> bool:
+        return self.__call({'op': 'cancel', 'job': job_id})['cancelled']
+
+    def status(self, job_id) -> dict:
+        return self.__call({'op': 'status', 'job': job_id})
+
+    def result(self, job_id, timeout=None) -> dict:
+        return self.__call({'op': 'result', 'job': job_id, 'timeout': timeout})
+
+    def stats(self) -> dict:
+        return self.__call({'op': 'stats'})
+
+    def watch(self, job_id, since=0, timeout=None):
+        for message in self.__stream({'op': 'watch', 'job': job_id, 'since': since, 'timeout': timeout}):
+            yield message
+
+    def __call(self, request) -> dict:
+        for message in self.__stream(request):
+            return message
+        raise ServiceError('no response')
+
+    def __stream(self, request):
+        with socket.create_connection(self.address, timeout=self.timeout) as connection:
+            connection.sendall(json.dumps(request).encode() + b'\n')
+            connection.shutdown(socket.SHUT_WR)
+            for line in connection.makefile('rb'):
+                message = json.loads(line)
+                if 'error' in message and 'event' not in message:
+                    raise ServiceError(message['error'])
+                yield message
+
+
+class LocalClient:
+    """
+    an in-process stand-in of SocketClient, the same methods on a SolverService in this process,
+    the messages pass through JSON as they would on the socket
+    """
+
+    def __init__(self, service: SolverService = None, workers=0):
+        """
+        :param service: optional, default: a new SolverService, closed by close()
+        :param workers: number of worker processes of the new service, 0: a thread of this process
+        """
+        self.__own = service is None
+        self.service = SolverService(workers=workers) if service is None else service
+
+    def submit(self, spec: dict):
+        return self.__call(self.service.submit, json.loads(json.dumps(spec)))
+
+    def cancel(self, job_id) -> bool:
+        return self.__call(self.service.cancel, job_id)
+
+    def status(self, job_id) -> dict:
+        return self.__call(self.service.status, job_id)
+
+    def result(self, job_id, timeout=None) -> dict:
+        return self.__call(self.service.result, job_id, timeout)
+
+    def stats(self) -> dict:
+        return self.__call(self.service.stats)
+
+    def watch(self, job_id, since=0, timeout=None):
+        # an unknown job is reported by the first next()
+        events = self.service.watch(job_id, since, timeout)
+        while True:
+            try:
+                event = self.__call(next, events)
+            except StopIteration:
+                return
+            yield event
+
+    def close(self):
+        if self.__own:
+            self.service.close()
+
+    @staticmethod
+    def __call(method, *args):
+        try:
+            return json.loads(json.dumps(method(*args)))
+        except StopIteration:
+            raise
+        except Exception as error:
+            raise ServiceError('%s: %s' % (type(error).__name__, error)) from error
+
+
+def main():
+    parser = argparse.ArgumentParser(description='solver service of IG')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help='run the service')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    serve.add_argument('--cache-size', type=int, default=8, help='max number of parsed graphs kept')
+    solve = subparsers.add_parser('solve', help='submit a dataset to a running service and follow it')
+    solve.add_argument('path')
+    solve.add_argument('--host', default='127.0.0.1')
+    solve.add_argument('--port', type=int, default=8765)
+    solve.add_argument('--max-iter', type=int, default=JOB_DEFAULTS['max_iter'])
+    solve.add_argument('--time-budget', type=float, default=None, help='seconds')
+    solve.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        service = SolverService(workers=args.workers, cache_size=args.cache_size)
+        with SolverServer(service, args.host, args.port) as server:
+            print('listening on %s:%d' % server.server_address)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                service.close()
+        return
+
+    client = SocketClient(args.host, args.port)
+    job_id = client.submit({'path': args.path, 'max_iter': args.max_iter, 'time_budget': args.time_budget,
+                            'seed': args.seed})
+    for event in client.watch(job_id):
+        print(json.dumps(event))
+
+
+if __name__ == '__main__':
+    main()